@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+
+import numpy as np
+
+import checkpoint
+import frame_sampler
+import media
+import shot_detect
+import silence_detect
+from storage import CHUNK_SIZE, commit_temp, discard_temp, open_temp
+from workspace import get_workspace
+
+# ============================================================
+# 영상별 분석 색인
+# - 디코딩이나 모델이 필요한 분석 결과(샷 변화 점수, 음량 곡선, 키프레임 위치, 자막, 구간 임베딩 등)를
+#   영상 내용 해시 기준으로 한 번만 계산해 analysis/<해시>/<항목>-<설정 해시>.npz 에 저장
+# - 주제/원하는 길이처럼 분석 뒤에 적용하는 값이 바뀌면 색인만 읽어 밀리초 안에 다시 계산
+#   (샷 경계 임계값, 무음 임계값도 색인에 저장한 점수/음량 곡선에서 바로 구함)
+# - 분석 설정이 바뀌면 설정 해시가 달라져 새로 계산. 색인 파일은 workspace 의 LRU 퇴출 대상
+# ============================================================
+
+ANALYSIS_DIRNAME = "analysis"
+# 저장 형식이나 분석 방식이 바뀌면 올려 이전 색인을 무효화
+INDEX_VERSION = 1
+
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+# (경로, 크기, 수정 시각) → 내용 해시 (같은 파일을 여러 번 해시하지 않도록)
+_digests = {}
+_locks = {}
+_guard = threading.Lock()
+
+
+def content_digest(path):
+    """파일 내용의 sha256. 저장소 객체는 파일 이름이 내용 해시이므로 다시 읽지 않음"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if _DIGEST_RE.fullmatch(name) and os.path.basename(os.path.dirname(os.path.dirname(path))) == "objects":
+        return name
+    identity = tuple(checkpoint.file_identity(path))
+    with _guard:
+        if identity in _digests:
+            return _digests[identity]
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    with _guard:
+        _digests[identity] = hasher.hexdigest()
+    return _digests[identity]
+
+
+def _lock_for(path):
+    with _guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+class AnalysisIndex:
+    def __init__(self, video_path, info=None, digest=None, workspace=None):
+        self.video_path = video_path
+        self.workspace = workspace or get_workspace()
+        self.digest = digest or content_digest(video_path)
+        self.dir = os.path.join(self.workspace.root, ANALYSIS_DIRNAME, self.digest[:2], self.digest)
+        self._info = info
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = media.media_info(self.video_path)
+        return self._info
+
+    def path_for(self, name, settings):
+        payload = json.dumps({"version": INDEX_VERSION, "settings": settings}, sort_keys=True, default=str)
+        return os.path.join(self.dir, f"{name}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]}.npz")
+
+    def load(self, name, settings, compute):
+        """name 항목의 {이름: 배열}. 색인에 없을 때만 compute() 로 계산해 저장"""
+        path = self.path_for(name, settings)
+        arrays = self._read(path)
+        if arrays is not None:
+            return arrays
+        # 같은 항목을 동시에 계산하지 않도록 항목별 잠금
+        with _lock_for(path):
+            arrays = self._read(path)
+            if arrays is None:
+                arrays = {key: np.asarray(value) for key, value in compute().items()}
+                self._write(path, arrays)
+        return arrays
+
+    def _read(self, path):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {key: data[key] for key in data.files}
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            # 없거나 퇴출 중이거나 깨진 파일이면 다시 계산
+            return None
+        self.workspace.touch(path)
+        return arrays
+
+    def _write(self, path, arrays):
+        os.makedirs(self.dir, exist_ok=True)
+        self.workspace.reserve(sum(array.nbytes for array in arrays.values()))
+        out, tmp_path = open_temp(self.dir, prefix=".index-")
+        try:
+            np.savez_compressed(out, **arrays)
+            commit_temp(out, tmp_path, path)
+        except BaseException:
+            discard_temp(out, tmp_path)
+            raise
+
+    # ---------------- 항목 ----------------
+    def shot_scores(self):
+        """(fps, 프레임 변화 점수 배열)"""
+        settings = {"width": shot_detect.ANALYSIS_WIDTH, "skip_bframes": shot_detect.SKIP_BFRAMES,
+                    "hist_bins": shot_detect.HIST_BINS, "hist_weight": shot_detect.HIST_WEIGHT,
+                    "sampler": frame_sampler.SAMPLER_VERSION}
+
+        def compute():
+            fps, scores = shot_detect.frame_scores(self.video_path, self.info)
+            return {"fps": fps, "scores": scores}
+
+        data = self.load("shot_scores", settings, compute)
+        return float(data["fps"]), data["scores"]
+
+    def shots(self, **kwargs):
+        """샷 경계 시각 배열 (kwargs 는 shot_detect.find_boundaries 의 임계값 설정)"""
+        fps, scores = self.shot_scores()
+        return shot_detect.find_boundaries(scores, fps, **kwargs)
+
+    def energy(self):
+        """창별 음량 곡선 (dBFS). 오디오가 없으면 빈 배열"""
+        settings = {"sample_rate": silence_detect.SAMPLE_RATE, "window": silence_detect.WINDOW_SECONDS}
+
+        def compute():
+            if not self.info.has_audio:
+                return {"db": np.empty(0, dtype=np.float32)}
+            return {"db": silence_detect.window_dbfs(silence_detect.read_pcm(self.video_path))}
+
+        return self.load("energy", settings, compute)["db"]
+
+    def keep_intervals(self, **kwargs):
+        """무음을 뺀 남길 구간 (kwargs 는 silence_detect.keep_intervals 의 설정)"""
+        if not self.info.has_audio:
+            return [(0.0, self.info.duration)]
+        return silence_detect.keep_intervals(self.energy(), duration=self.info.duration, **kwargs)
+
+    def keyframes(self):
+        return [float(t) for t in self.load("keyframes", {}, lambda: {
+            "times": np.asarray(media.keyframe_times(self.video_path), dtype=np.float64)})["times"]]
@@ -1,29 +1,46 @@
 import streamlit as st
+import json
 import os
 import time
+import uuid
+
+import metrics
+from jobs import ACTIVE_STATUSES, DONE, get_job_queue
+from pipeline import report_path, resume_pipeline, run_pipeline
+from storage import store_upload
+from workspace import WorkspaceFullError, get_workspace
+
+CUT_MODE_OPTIONS = {
+    "스마트 렌더 (경계 GOP만 재인코딩, 권장)": "smart",
+    "정확한 컷 (재인코딩)": "reencode",
+    "빠른 컷 (키프레임 단위, 재인코딩 없음)": "fast",
+}
+# 작업 상태를 다시 확인하는 간격 (초)
+POLL_SECONDS = 1.0
 
 # ============================================================
-# Placeholder 함수들 - 실제 구현 시 AI 모델/API 호출로 대체 가능
+# 업로드 저장 - 내용 해시 기반 저장소에 한 번만 기록
 # ============================================================
-def ai_cut_edit(video_path, subject, desired_length):
-    st.info(f"컷 편집 진행 중... (주제: {subject}, 길이: {desired_length}초)")
-    time.sleep(2)
-    return "output_cut_edit.mp4"
-
-def ai_add_subtitles(video_path, font_path, subtitle_style, subtitle_color, font_size):
-    st.info("자막 추가 진행 중...")
-    time.sleep(2)
-    return "output_subtitles.mp4"
-
-def ai_translate_video(video_path, target_language):
-    st.info(f"번역 진행 중... (대상 언어: {target_language})")
-    time.sleep(2)
-    return "output_translation.mp4"
-
-def insert_transition_video(video_path, transition_path):
-    st.info("전환 영상 삽입 진행 중...")
-    time.sleep(2)
-    return "output_transition.mp4"
+workspace = get_workspace()
+# 서버 재시작으로 중단된 작업은 완료된 단계부터 이어서 실행
+job_queue = get_job_queue(resume_fn=resume_pipeline)
+# VOCI_METRICS_PORT 가 설정된 경우에만 /metrics 제공
+metrics.start_server()
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+def ingest_upload(uploaded_file):
+    # 같은 업로드로 다시 실행하면 해시 계산과 쓰기를 모두 건너뜀
+    memo = st.session_state.setdefault("ingested_uploads", {})
+    file_id = getattr(uploaded_file, "file_id", None)
+    key = (file_id, uploaded_file.name, uploaded_file.size)
+    cached = memo.get(key) if file_id is not None else None
+    if cached is not None and os.path.exists(cached[1]):
+        return cached
+    workspace.reserve(uploaded_file.size)
+    digest, path = store_upload(uploaded_file, workspace.store_dir, os.path.splitext(uploaded_file.name)[1])
+    if file_id is not None:
+        memo[key] = (digest, path)
+    return digest, path
 
 # ============================================================
 # Streamlit 앱 시작
@@ -48,6 +65,8 @@ if "자동 AI 컷 편집" in selected_features:
     st.subheader("컷 편집 옵션")
     subject_input = st.text_input("살리고 싶은 주제 (예: 인터뷰, 제품 소개 등)", "")
     desired_length = st.number_input("원하는 영상 길이 (초 단위)", min_value=1, value=60)
+    cut_mode = st.selectbox("컷 방식", options=list(CUT_MODE_OPTIONS))
+    remove_silence = st.checkbox("말이 없는 구간 먼저 빼기", value=True)
 
 if "자동 AI 자막" in selected_features:
     st.subheader("자막 옵션")
@@ -65,46 +84,87 @@ if "화면 전환 영상 삽입" in selected_features:
     transition_video = st.file_uploader("삽입할 전환 영상 파일 업로드 (mp4, mov, avi)", type=["mp4", "mov", "avi"], key="transition")
 
 # 편집 실행 버튼
+def submit_edit():
+    # 업로드 파일 저장 (같은 내용이면 기존 파일 재사용). 작업이 시작될 때까지 고정
+    video_digest, video_path = ingest_upload(uploaded_video)
+    params = {"session_id": session_id, "video": {"digest": video_digest, "path": video_path},
+              "inputs": [video_path]}
+
+    if "자동 AI 컷 편집" in selected_features:
+        params["cut"] = {"subject": subject_input, "desired_length": desired_length,
+                         "mode": CUT_MODE_OPTIONS[cut_mode], "remove_silence": remove_silence}
+
+    if "자동 AI 자막" in selected_features:
+        font_digest, font_path = None, None
+        if font_file is not None:
+            font_digest, font_path = ingest_upload(font_file)
+            params["inputs"].append(font_path)
+        params["subtitles"] = {"font_digest": font_digest, "font_path": font_path, "style": subtitle_style,
+                               "color": subtitle_color, "size": font_size}
+
+    if "자동 AI 번역" in selected_features:
+        params["translation"] = {"target_language": target_language}
+
+    if "화면 전환 영상 삽입" in selected_features:
+        if 'transition_video' in globals() and transition_video is not None:
+            transition_digest, transition_path = ingest_upload(transition_video)
+            params["inputs"].append(transition_path)
+            params["transition"] = {"digest": transition_digest, "path": transition_path}
+        else:
+            st.error("전환 영상을 선택해 주세요.")
+
+    workspace.acquire(*params["inputs"])
+    job_id = job_queue.submit(session_id, params, run_pipeline)
+    st.session_state["job_id"] = job_id
+    # 새로고침하거나 다시 접속해도 같은 작업을 볼 수 있도록 URL 에 기록
+    st.query_params["job"] = job_id
+    st.success("영상 업로드 완료. 편집 작업을 시작합니다.")
+
+
+def show_job_status():
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    job = job_queue.store.get(job_id) if job_id else None
+    if job is None:
+        return
+    st.header("편집 작업 상태")
+    if job["status"] in ACTIVE_STATUSES:
+        st.progress(job["progress"], text=job["message"] or "")
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+    elif job["status"] == DONE:
+        st.success("모든 편집 작업이 완료되었습니다!")
+        if job["result_path"] and os.path.exists(job["result_path"]):
+            with open(job["result_path"], "rb") as f:
+                st.download_button("편집된 영상 다운로드", f, file_name="edited_video.mp4")
+        else:
+            st.warning("결과 파일이 정리되었습니다. 편집을 다시 시작해 주세요.")
+    else:
+        st.error(f"편집 실패: {job['error']}")
+    show_job_report(job_id)
+
+
+def show_job_report(job_id):
+    path = report_path(job_id)
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    with st.expander("처리 성능 보고서"):
+        st.dataframe([
+            {key: stage[key] for key in ("stage", "wall_seconds", "cpu_seconds", "peak_rss_bytes",
+                                         "read_bytes", "write_bytes")}
+            for stage in report["stages"]
+        ])
+        st.json(report, expanded=False)
+
+
 if st.button("영상 편집 시작"):
     if uploaded_video is not None:
-        # 업로드 파일 임시 저장
-        os.makedirs("temp", exist_ok=True)
-        video_path = os.path.join("temp", uploaded_video.name)
-        with open(video_path, "wb") as f:
-            f.write(uploaded_video.getbuffer())
-        st.success("영상 업로드 완료. 편집을 시작합니다.")
-        current_video = video_path
-
-        # 각 기능별 실행 (사용자가 선택한 기능에 따라)
-        if "자동 AI 컷 편집" in selected_features:
-            current_video = ai_cut_edit(current_video, subject_input, desired_length)
-            st.success("컷 편집 완료")
-        
-        if "자동 AI 자막" in selected_features:
-            font_path = None
-            if font_file is not None:
-                font_path = os.path.join("temp", font_file.name)
-                with open(font_path, "wb") as f:
-                    f.write(font_file.getbuffer())
-            current_video = ai_add_subtitles(current_video, font_path, subtitle_style, subtitle_color, font_size)
-            st.success("자막 추가 완료")
-        
-        if "자동 AI 번역" in selected_features:
-            current_video = ai_translate_video(current_video, target_language)
-            st.success("번역 완료")
-        
-        if "화면 전환 영상 삽입" in selected_features:
-            if 'transition_video' in locals() and transition_video is not None:
-                transition_path = os.path.join("temp", transition_video.name)
-                with open(transition_path, "wb") as f:
-                    f.write(transition_video.getbuffer())
-                current_video = insert_transition_video(current_video, transition_path)
-                st.success("전환 영상 삽입 완료")
-            else:
-                st.error("전환 영상을 선택해 주세요.")
-        
-        st.success("모든 편집 작업이 완료되었습니다!")
-        with open(current_video, "rb") as f:
-            st.download_button("편집된 영상 다운로드", f, file_name="edited_video.mp4")
+        try:
+            submit_edit()
+        except WorkspaceFullError as e:
+            st.error(str(e))
     else:
-        st.error("편집할 영상을 먼저 업로드해 주세요.")
\ No newline at end of file
+        st.error("편집할 영상을 먼저 업로드해 주세요.")
+
+show_job_status()
@@ -0,0 +1,324 @@
+import json
+import os
+import re
+
+import numpy as np
+
+import checkpoint
+import media
+import metrics
+import models
+import quantize
+import silence_detect
+from analysis_index import AnalysisIndex
+
+# ============================================================
+# 음성 인식 (Whisper 계열, transformers, CPU)
+# - 분석 색인의 음량 곡선으로 음성 구간만 찾고(VAD) 무음에는 연산을 쓰지 않음
+# - 음성 구간을 모델 입력 길이(30초) 이하의 조각으로 묶고, 긴 구간은 OVERLAP_SECONDS 만큼 겹쳐 나눔
+#   (겹친 부분은 두 조각의 가운데 시각을 기준으로 한쪽 결과만 사용)
+# - 조각을 BATCH_SIZE 개씩 모델(fp32 / int8 / onnx, quantize.py)에 넣고,
+#   끝난 조각은 체크포인트로 남겨 중단 후 남은 조각만 다시 인식
+# - 결과: 구간(문장) 단위 {시작, 끝, 텍스트, 언어, 신뢰도, 단어 목록} (영상 단위 저장은 transcript.py)
+# - 단어 시각: 모델의 교차 어텐션 정렬(alignment heads + DTW)로 토큰마다 시각을 받아 씀
+#   정렬 출력을 낼 수 없는 백엔드(onnx)나 정렬 헤드가 없는 모델만 구간 안에서 글자 수 비율로 나눈 근사값
+# ============================================================
+
+MODEL_NAME = os.environ.get("VOCI_ASR_MODEL", "openai/whisper-small")
+# 비우면 조각마다 언어를 자동 감지
+LANGUAGE = os.environ.get("VOCI_ASR_LANGUAGE") or None
+THREADS = int(os.environ.get("VOCI_ASR_THREADS", "0")) or os.cpu_count() or 1
+BATCH_SIZE = int(os.environ.get("VOCI_ASR_BATCH", "8"))
+# 1 이면 탐욕 디코딩
+NUM_BEAMS = 1
+
+# Whisper 입력 길이
+CHUNK_SECONDS = 30.0
+OVERLAP_SECONDS = 2.0
+# VAD 설정: 음악/잡음 구간을 조금 더 보수적으로 남기도록 무음 기준은 컷 편집보다 짧게
+VAD_MIN_SILENCE_SECONDS = 0.4
+VAD_PADDING_SECONDS = 0.25
+
+# 인식 방식이 바뀌면 올려 체크포인트를 무효화
+ASR_VERSION = 3
+
+
+def _load(model_name, backend):
+    import torch
+    from transformers import WhisperProcessor
+
+    torch.set_num_threads(THREADS)
+    processor = WhisperProcessor.from_pretrained(model_name)
+    return processor, quantize.load_model("speech_seq2seq", model_name, backend)
+
+
+def get_recognizer(model_name=MODEL_NAME, backend=None):
+    """(processor, model). backend: quantize.BACKENDS 중 하나 (없으면 quantize.BACKEND)"""
+    backend = quantize.check_backend(backend or quantize.BACKEND)
+    return models.get_model(f"asr:{model_name}:{backend}", lambda: _load(model_name, backend))
+
+
+def speech_intervals(index):
+    """음성이 있는 구간 (분석 색인의 음량 곡선 사용)"""
+    return index.keep_intervals(min_silence=VAD_MIN_SILENCE_SECONDS, padding=VAD_PADDING_SECONDS)
+
+
+def plan_chunks(intervals, chunk_seconds=CHUNK_SECONDS, overlap=OVERLAP_SECONDS):
+    """음성 구간 → [(조각 시작, 조각 끝, 결과를 쓸 시작, 결과를 쓸 끝)]
+
+    짧은 구간은 chunk_seconds 안에 들어가는 만큼 한 조각으로 묶고, 긴 구간은 overlap 만큼 겹쳐 나눔
+    """
+    windows = []
+    for start, end in intervals:
+        if windows and end - windows[-1][0] <= chunk_seconds and windows[-1][2] == "packed":
+            windows[-1] = (windows[-1][0], end, "packed")
+            continue
+        if end - start <= chunk_seconds:
+            windows.append((start, end, "packed"))
+            continue
+        stride = chunk_seconds - overlap
+        t = start
+        while t < end:
+            windows.append((t, min(t + chunk_seconds, end), "split"))
+            if t + chunk_seconds >= end:
+                break
+            t += stride
+    chunks = []
+    for i, (start, end, _) in enumerate(windows):
+        keep_from = start
+        keep_to = end
+        if i > 0 and windows[i - 1][1] > start:
+            keep_from = (windows[i - 1][1] + start) / 2
+        if i + 1 < len(windows) and windows[i + 1][0] < end:
+            keep_to = (end + windows[i + 1][0]) / 2
+        chunks.append((start, end, keep_from, keep_to))
+    return chunks
+
+
+# Whisper 타임스탬프 토큰 하나의 시간 간격
+TIMESTAMP_STEP = 0.02
+# 특징(멜 스펙트로그램) 프레임 하나의 샘플 수 (토큰 시각 정렬을 실제 오디오 길이까지로 제한할 때 사용)
+HOP_LENGTH = 160
+_LANGUAGE_TOKEN_RE = re.compile(r"<\|([a-z]{2,3})\|>")
+
+
+def _token_logprobs(sequences, scores):
+    """생성한 토큰마다 log 확률 (batch, 생성 길이). sequences 의 끝 len(scores) 개가 생성한 토큰"""
+    import torch
+
+    offset = sequences.shape[1] - len(scores)
+    out = torch.empty((sequences.shape[0], len(scores)), dtype=torch.float32)
+    for k, step in enumerate(scores):
+        step = step.float().reshape(sequences.shape[0], -1)
+        out[:, k] = step.log_softmax(-1).gather(1, sequences[:, offset + k:offset + k + 1])[:, 0]
+    return offset, out.numpy()
+
+
+def _generated_rows(out, word_times):
+    """generate 출력 → 조각마다 (프롬프트 포함 토큰 목록, 토큰별 log 확률, 토큰별 정렬 시각 또는 None)
+
+    transformers 4 는 묶음 전체의 sequences/scores/token_timestamps 를 돌려주고,
+    transformers 5 는 조각마다 내부 generate 결과(segments[row][0]["result"], 프롬프트 포함)를 따로 담아 돌려줌
+    """
+    if "segments" in out:
+        for segments in out["segments"]:
+            if not segments:  # 타임스탬프 구간을 하나도 못 만든 조각
+                yield [], np.zeros(0, dtype=np.float32), None
+                continue
+            result = segments[0]["result"]
+            sequences = result["sequences"][None]
+            offset, logprobs = _token_logprobs(sequences, result["scores"])
+            token_times = result.get("token_timestamps") if word_times else None
+            yield _aligned_row(sequences[0], offset, logprobs[0], token_times)
+        return
+    offset, logprobs = _token_logprobs(out.sequences, out.scores)
+    for row in range(out.sequences.shape[0]):
+        token_times = out.token_timestamps[row] if word_times else None
+        yield _aligned_row(out.sequences[row], offset, logprobs[row], token_times)
+
+
+def _aligned_row(sequence, offset, logprobs, token_times):
+    """생성 토큰의 log 확률·정렬 시각을 프롬프트까지 포함한 토큰 위치에 맞춤"""
+    length = sequence.shape[0]
+    row_logprobs = np.concatenate([np.full(offset, np.nan, dtype=np.float32), logprobs])
+    row_times = _right_align(token_times.float().numpy(), length) if token_times is not None else None
+    return sequence.tolist(), row_logprobs, row_times
+
+
+def word_times_supported(model, backend):
+    """모델이 토큰 시각(교차 어텐션 정렬)을 낼 수 있는지
+
+    onnx 백엔드는 어텐션을 출력하지 않고, 정렬 헤드가 없는 모델(파인튜닝 모델 등)은 정렬할 수 없음
+    """
+    generation_config = getattr(model, "generation_config", None)
+    return backend != "onnx" and getattr(generation_config, "alignment_heads", None) is not None
+
+
+def _right_align(values, length):
+    """끝을 맞춰 length 길이로 (앞의 모자란 자리는 nan). 생성 출력마다 프롬프트 포함 여부가 달라도 토큰 위치가 맞도록"""
+    out = np.full(length, np.nan, dtype=np.float32)
+    n = min(length, len(values))
+    if n:
+        out[length - n:] = values[len(values) - n:]
+    return out
+
+
+def _split_words(token_ids, logprobs, times, tokenizer, start, end):
+    """구간의 텍스트 토큰 → 단어 목록
+
+    times: 토큰마다 시작 시각 (마지막은 구간을 닫는 토큰의 시각, 길이 len(token_ids) + 1). 없으면(None)
+    단어 시각을 구간 안에서 글자 수 비율로 나눈 근사값으로 정함
+    """
+    groups = []
+    for i, (token, token_str, logprob) in enumerate(zip(token_ids, tokenizer.convert_ids_to_tokens(token_ids),
+                                                         logprobs)):
+        # 바이트 BPE 에서 공백으로 시작하는 토큰이 새 단어의 시작
+        if not groups or token_str.startswith("\u0120"):
+            groups.append(([], [], i))
+        groups[-1][0].append(token)
+        groups[-1][1].append(logprob)
+    words = [(tokenizer.decode(ids).strip(), float(np.exp(np.mean(lps))), first) for ids, lps, first in groups]
+    words = [word for word in words if word[0]]
+    out = []
+    if times is not None:
+        # 단어는 첫 토큰의 시각에 시작해 다음 단어(마지막 단어는 구간을 닫는 토큰)의 시각에 끝남
+        bounds = [times[first] for _, _, first in words] + [times[-1]]
+        t = start
+        for (text, probability, _), t_start, t_end in zip(words, bounds, bounds[1:]):
+            t_start = min(max(float(t_start), t), end)
+            t_end = min(max(float(t_end), t_start), end)
+            out.append({"start": t_start, "end": t_end, "text": text, "probability": probability})
+            t = t_start
+        return out
+    total = sum(len(text) for text, _, _ in words) or 1
+    t = start
+    for text, probability, _ in words:
+        t_end = t + (end - start) * len(text) / total
+        out.append({"start": t, "end": t_end, "text": text, "probability": probability})
+        t = t_end
+    return out
+
+
+def parse_tokens(token_ids, logprobs, tokenizer, duration, timestamp_begin, token_times=None):
+    """Whisper 출력 토큰 하나(조각) → {"language", "segments": [{"start", "end", "text", "confidence", "words"}]}
+
+    logprobs 는 token_ids 와 같은 길이 (프롬프트 토큰은 nan). 시각은 조각 기준
+    token_times: token_ids 와 같은 길이의 토큰별 정렬 시각 (없으면 단어 시각은 글자 수 비율로 나눈 근사값)
+    """
+    language = None
+    segments = []
+    seg_start, seg_tokens, seg_logprobs, seg_times = None, [], [], []
+
+    def close(seg_end, end_time):
+        text = tokenizer.decode(seg_tokens).strip()
+        if text:
+            lps = [lp for lp in seg_logprobs if not np.isnan(lp)]
+            seg_end = max(seg_end, seg_start)
+            times = seg_times + [end_time]
+            if token_times is None or np.isnan(times).any():
+                times = None
+            segments.append({"start": seg_start, "end": seg_end, "text": text,
+                             "confidence": float(np.exp(np.mean(lps))) if lps else 0.0,
+                             "words": _split_words(seg_tokens, seg_logprobs, times, tokenizer, seg_start, seg_end)})
+
+    for i, (token, logprob) in enumerate(zip(token_ids, logprobs)):
+        token = int(token)
+        token_time = float(token_times[i]) if token_times is not None else np.nan
+        if token == tokenizer.eos_token_id:
+            break
+        if token >= timestamp_begin:
+            t = (token - timestamp_begin) * TIMESTAMP_STEP
+            if seg_start is None:
+                seg_start = t
+            else:
+                close(t, token_time)
+                seg_start, seg_tokens, seg_logprobs, seg_times = None, [], [], []
+        elif token in tokenizer.all_special_ids:
+            match = _LANGUAGE_TOKEN_RE.fullmatch(tokenizer.convert_ids_to_tokens(token))
+            if match and language is None:
+                language = match.group(1)
+        else:
+            if seg_start is None:
+                seg_start = 0.0 if not segments else segments[-1]["end"]
+            seg_tokens.append(token)
+            seg_logprobs.append(float(logprob))
+            seg_times.append(token_time)
+    if seg_tokens:
+        # 끝 타임스탬프 없이 끝난 구간은 조각 끝까지
+        close(duration, duration)
+    return {"language": language or LANGUAGE, "segments": segments}
+
+
+def recognize(audio_batch, model_name=MODEL_NAME, backend=None):
+    """float32 16kHz 오디오(30초 이하) 목록 → 조각마다 parse_tokens 결과 (조각 기준 시각)"""
+    import torch
+
+    processor, model = get_recognizer(model_name, backend)
+    features = processor.feature_extractor(audio_batch, sampling_rate=silence_detect.SAMPLE_RATE,
+                                           return_tensors="pt").input_features
+    generate_args = {"return_timestamps": True, "task": "transcribe", "num_beams": NUM_BEAMS,
+                     "return_dict_in_generate": True, "output_scores": True}
+    if LANGUAGE:
+        generate_args["language"] = LANGUAGE
+    # 파이프라인의 return_timestamps="word" 와 같은 정렬 출력 (토큰마다 시각, 조각 기준 초)
+    word_times = word_times_supported(model, quantize.check_backend(backend or quantize.BACKEND))
+    if word_times:
+        generate_args["return_token_timestamps"] = True
+        # 정렬을 실제 오디오가 있는 특징 프레임까지로 제한 (30초로 채운 뒤쪽 무음에 단어가 늘어지지 않도록)
+        generate_args["num_frames"] = max(len(audio) for audio in audio_batch) // HOP_LENGTH
+    with torch.inference_mode(), metrics.native_work():
+        out = model.generate(features, **generate_args)
+    tokenizer = processor.tokenizer
+    timestamp_begin = tokenizer.convert_tokens_to_ids("<|0.00|>")
+    return [parse_tokens(token_ids, row_logprobs, tokenizer, len(audio) / silence_detect.SAMPLE_RATE,
+                         timestamp_begin, row_times)
+            for audio, (token_ids, row_logprobs, row_times) in zip(audio_batch, _generated_rows(out, word_times))]
+
+
+def _write_json(data):
+    def render(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return render
+
+
+def transcribe(video_path, model_name=MODEL_NAME, backend=None):
+    """영상 음성을 인식해 구간 목록을 반환 (오디오가 없으면 빈 목록)
+
+    구간: {"start", "end", "text", "language", "confidence", "words": [{"start", "end", "text", "probability"}]}
+    """
+    backend = backend or quantize.BACKEND
+    index = AnalysisIndex(video_path)
+    if not index.info.has_audio:
+        return []
+    chunks = plan_chunks(speech_intervals(index))
+    if not chunks:
+        return []
+    identity = {"asr": index.digest, "model": model_name, "backend": backend, "language": LANGUAGE,
+                "beams": NUM_BEAMS, "chunks": chunks, "version": ASR_VERSION}
+    rate = silence_detect.SAMPLE_RATE
+    segments = []
+    with checkpoint.Chunks(identity) as done:
+        names = [f"{i:05d}.json" for i in range(len(chunks))]
+        pending = [i for i, name in enumerate(names) if not done.done(name)]
+        pcm = silence_detect.read_pcm(video_path) if pending else None
+        for b in range(0, len(pending), BATCH_SIZE):
+            batch = pending[b:b + BATCH_SIZE]
+            audio = [pcm[int(chunks[i][0] * rate):int(chunks[i][1] * rate)].astype(np.float32) / 32768.0
+                     for i in batch]
+            for i, result in zip(batch, recognize(audio, model_name, backend)):
+                done.run(names[i], _write_json(result))
+            media.report(min(1.0, (b + len(batch)) / len(pending)))
+        for (start, _, keep_from, keep_to), name in zip(chunks, names):
+            with open(done.path(name), encoding="utf-8") as f:
+                result = json.load(f)
+            for segment in result["segments"]:
+                # 겹친 부분은 시작 시각이 이 조각의 담당 범위에 들어가는 결과만 사용
+                if not keep_from <= start + segment["start"] < keep_to:
+                    continue
+                segment.update(start=start + segment["start"], end=start + segment["end"],
+                               language=result["language"])
+                for word in segment["words"]:
+                    word.update(start=start + word["start"], end=start + word["end"])
+                segments.append(segment)
+    return segments
@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg  # noqa: E402
+
+import filtergraph  # noqa: E402
+import media  # noqa: E402
+import parallel_encode  # noqa: E402
+
+# ============================================================
+# 단일 프로세스 인코딩 vs 병렬 구간 인코딩 비교
+# 사용 예: python benchmarks/bench_parallel_encode.py --duration 120 --size 1920x1080 --workers 4 8 16
+# ============================================================
+
+
+def make_input(path, duration, size, fps, gop):
+    v = ffmpeg.input(f"testsrc2=size={size}:rate={fps}:duration={duration}", f="lavfi")
+    a = ffmpeg.input(f"sine=frequency=440:duration={duration}", f="lavfi")
+    media.run(ffmpeg.output(v, a, path, vcodec="libx264", preset="ultrafast", g=gop, acodec="aac"))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="단일 프로세스 인코딩 vs 병렬 구간 인코딩 비교")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--gop", type=int, default=60, help="입력 영상의 키프레임 간격 (프레임)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[parallel_encode.WORKERS])
+    parser.add_argument("--threads", type=int, default=parallel_encode.THREADS_PER_WORKER)
+    parser.add_argument("--segment-seconds", type=float, default=parallel_encode.SEGMENT_SECONDS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        src = os.path.join(workdir, "input.mp4")
+        make_input(src, args.duration, args.size, args.fps, args.gop)
+        info = media.media_info(src)
+        keyframes = media.keyframe_times(src)
+
+        results = []
+        out = os.path.join(workdir, "single.mp4")
+        seconds = timed(lambda: media.run(filtergraph.compile_graph(src, [], out, workdir)))
+        results.append({"mode": "single", "workers": 1, "seconds": seconds})
+
+        for workers in args.workers:
+            out = os.path.join(workdir, f"parallel-{workers}.mp4")
+            seconds = timed(lambda: parallel_encode.encode(
+                src, out, [(0.0, info.duration)], [], workdir, has_audio=info.has_audio, keyframes=keyframes,
+                workers=workers, threads=args.threads, segment_seconds=args.segment_seconds,
+            ))
+            results.append({"mode": "parallel", "workers": workers, "threads": args.threads,
+                            "segment_seconds": args.segment_seconds, "seconds": seconds})
+
+    for result in results:
+        result["x_realtime"] = args.duration / result["seconds"]
+    print(json.dumps({"duration": args.duration, "size": args.size, "fps": args.fps, "cpu_count": os.cpu_count(),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
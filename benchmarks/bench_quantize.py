@@ -0,0 +1,142 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import quantize  # noqa: E402
+
+# ============================================================
+# 추론 백엔드(fp32 / int8 / onnx) 비교: 처리량, 최대 메모리, 정확도
+# - 백엔드마다 새 프로세스에서 실행해 메모리를 따로 잼
+# - 정확도: 정답(--reference)이 있으면 단어 오류율(WER), 없으면 fp32 결과와의 차이
+# 사용 예:
+#   python benchmarks/bench_quantize.py --audio interview.wav --reference interview.txt
+#   python benchmarks/bench_quantize.py --sentences lines.ko.txt --source ko --target en
+# ============================================================
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = reference.split(), hypothesis.split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_asr(backend, audio_path):
+    import asr
+    import silence_detect
+
+    pcm = silence_detect.read_pcm(audio_path)
+    duration = len(pcm) / silence_detect.SAMPLE_RATE
+    chunks = asr.plan_chunks([(0.0, duration)])
+    asr.get_recognizer(backend=backend)
+    start = time.perf_counter()
+    texts = []
+    for b in range(0, len(chunks), asr.BATCH_SIZE):
+        batch = chunks[b:b + asr.BATCH_SIZE]
+        audio = [pcm[int(s * silence_detect.SAMPLE_RATE):int(e * silence_detect.SAMPLE_RATE)].astype(np.float32)
+                 / 32768.0 for s, e, _, _ in batch]
+        for (s, _, keep_from, keep_to), result in zip(batch, asr.recognize(audio, backend=backend)):
+            texts.extend(seg["text"] for seg in result["segments"] if keep_from <= s + seg["start"] < keep_to)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "x_realtime": duration / seconds, "output": " ".join(texts)}
+
+
+def run_translation(backend, source, target, sentences):
+    import translate
+    from translation_memory import TranslationMemory
+
+    # 모델 불러오기는 재지 않도록 한 줄로 먼저 불러옴. 번역 메모리는 매번 빈 메모리로 (저장된 번역을 쓰지 않도록)
+    translate.translate_lines(sentences[:1], target, source, "marian", backend, TranslationMemory(":memory:"))
+    start = time.perf_counter()
+    outputs = translate.translate_lines(sentences, target, source, "marian", backend, TranslationMemory(":memory:"))
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "lines_per_minute": len(sentences) / seconds * 60, "output": outputs}
+
+
+def _worker(task, backend, args, queue):
+    try:
+        if task == "asr":
+            result = run_asr(backend, args["audio"])
+        else:
+            result = run_translation(backend, args["source"], args["target"], args["sentences"])
+        result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": f"{e.__class__.__name__}: {e}"})
+
+
+def measure(task, backend, args):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(task, backend, args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def accuracy(task, output, reference, baseline):
+    if task == "asr":
+        target = reference if reference is not None else baseline
+        return {"wer": word_error_rate(target, output), "against": "reference" if reference is not None else "fp32"}
+    same = sum(a == b for a, b in zip(output, baseline)) / max(1, len(baseline))
+    wer = sum(word_error_rate(b, a) for a, b in zip(output, baseline)) / max(1, len(baseline))
+    return {"exact_match_vs_fp32": same, "wer_vs_fp32": wer}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 / int8 / onnx 추론 백엔드 비교")
+    parser.add_argument("--backends", nargs="+", default=["fp32", "int8"], choices=quantize.BACKENDS)
+    parser.add_argument("--audio", help="음성 인식에 사용할 오디오/영상 파일")
+    parser.add_argument("--reference", help="--audio 의 정답 텍스트 파일")
+    parser.add_argument("--sentences", help="번역할 문장 파일 (한 줄에 한 문장)")
+    parser.add_argument("--source", default="ko", help="--sentences 의 언어")
+    parser.add_argument("--target", default="en", help="번역할 언어 (translate.MARIAN_MODEL 로 모델을 정함)")
+    args = parser.parse_args()
+
+    options = {"audio": args.audio, "source": args.source, "target": args.target}
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = " ".join(f.read().split())
+    if args.sentences:
+        with open(args.sentences, encoding="utf-8") as f:
+            # 같은 줄은 한 번만 번역되므로 중복을 빼고 잼
+            options["sentences"] = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    tasks = [task for task, given in (("asr", args.audio), ("translation", args.sentences)) if given]
+    if not tasks:
+        parser.error("--audio 또는 --sentences 를 지정해 주세요.")
+
+    report = {"cpu_count": os.cpu_count(), "results": []}
+    for task in tasks:
+        # 정확도 비교 기준이 되도록 fp32 를 항상 먼저 실행
+        backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+        baseline = None
+        for backend in backends:
+            result = measure(task, backend, options)
+            if "error" not in result:
+                baseline = result["output"] if backend == "fp32" else baseline
+                if baseline is not None:
+                    result.update(accuracy(task, result["output"], reference, baseline))
+                result.pop("output")
+            report["results"].append({"task": task, "backend": backend, **result})
+            print(f"{task} {backend}: {result.get('error') or round(result['seconds'], 2)}", file=sys.stderr)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
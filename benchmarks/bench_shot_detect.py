@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg  # noqa: E402
+import numpy as np  # noqa: E402
+
+import media  # noqa: E402
+import shot_detect  # noqa: E402
+
+# ============================================================
+# 샷 경계 검출 속도/정확도 측정 (서로 다른 합성 장면을 이어 붙인 영상 사용)
+# 사용 예: python benchmarks/bench_shot_detect.py --size 1920x1080 --duration 120 --shot-seconds 4
+# ============================================================
+
+SOURCES = ("testsrc2", "smptebars", "mandelbrot", "testsrc", "rgbtestsrc", "life=s={size}:mold=10:ratio=0.1")
+
+
+def make_input(path, size, duration, shot_seconds, fps):
+    """shot_seconds 마다 장면이 바뀌는 영상. 실제 경계 시각 목록을 반환"""
+    count = max(1, int(duration // shot_seconds))
+    parts = []
+    for i in range(count):
+        source = SOURCES[i % len(SOURCES)].format(size=size)
+        name, _, options = source.partition("=")
+        options = f"{options}:" if options else f"size={size}:"
+        v = ffmpeg.input(f"{name}={options}rate={fps}", f="lavfi").video
+        # 같은 소스가 다시 나올 때는 다른 부분을 씀 (같은 필터 노드가 두 번 쓰이지 않도록)
+        start = (i // len(SOURCES)) * shot_seconds
+        parts.append(v.filter("trim", start=start, duration=shot_seconds).filter("setpts", "PTS-STARTPTS")
+                     .filter("scale", *size.split("x")).filter("format", "yuv420p"))
+    v = ffmpeg.concat(*parts, v=1, a=0)
+    media.run(ffmpeg.output(v, path, vcodec="libx264", preset="veryfast", g=250))
+    return [i * shot_seconds for i in range(1, count)]
+
+
+def decode_seconds(path, skip_bframes):
+    """같은 입력 옵션으로 디코딩만 하는 시간 (분석 속도의 상한)"""
+    input_args = {"skip_loop_filter": "all"}
+    if skip_bframes:
+        input_args["skip_frame"] = "bidir"
+    start = time.perf_counter()
+    media.run(ffmpeg.output(ffmpeg.input(path, **input_args).video, "-", f="null"))
+    return time.perf_counter() - start
+
+
+def accuracy(found, truth, tolerance):
+    """B 프레임을 건너뛰면 경계가 몇 프레임 늦게 잡힐 수 있으므로 tolerance 안이면 맞은 것으로 봄"""
+    found = np.asarray(found)
+    hits = sum(1 for t in truth if len(found) and np.min(np.abs(found - t)) <= tolerance)
+    return {"precision": hits / len(found) if len(found) else 1.0, "recall": hits / len(truth) if truth else 1.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="샷 경계 검출 속도/정확도 측정")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--shot-seconds", type=float, default=4)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--all-cores", action="store_true", help="기본은 CPU 코어 하나로 제한해 측정")
+    args = parser.parse_args()
+
+    if not args.all_cores and hasattr(os, "sched_setaffinity"):
+        # ffmpeg 하위 프로세스도 같은 제한을 물려받음
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        src = os.path.join(workdir, "input.mp4")
+        truth = make_input(src, args.size, args.duration, args.shot_seconds, args.fps)
+        info = media.media_info(src)
+        for skip_bframes in (True, False):
+            shot_detect.SKIP_BFRAMES = skip_bframes
+            start = time.perf_counter()
+            boundaries = shot_detect.detect(src, info)
+            seconds = time.perf_counter() - start
+            decode = decode_seconds(src, skip_bframes)
+            results.append({"skip_bframes": skip_bframes, "seconds": seconds, "x_realtime": info.duration / seconds,
+                            "decode_only_x_realtime": info.duration / decode,
+                            "boundaries": len(boundaries), **accuracy(boundaries, truth, 4 / args.fps)})
+
+    print(json.dumps({"size": args.size, "duration": args.duration, "shot_seconds": args.shot_seconds,
+                      "fps": args.fps, "analysis_width": shot_detect.ANALYSIS_WIDTH, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg  # noqa: E402
+
+import media  # noqa: E402
+
+# ============================================================
+# 단계별 / 전체 파이프라인 벤치마크 (합성 영상 사용)
+# - stages.ai_cut_edit / ai_add_subtitles / ai_translate_video / insert_transition_video 와
+#   pipeline.run_pipeline 을 그대로 실행 (무음/샷 분석, 음성 인식, 관련도, 번역 포함)
+# - 실행마다 빈 workspace 를 쓰는 새 프로세스에서 실행 (분석 색인/단계 캐시/번역 메모리를 재사용하지 않음)
+# - --models stub: 음성 인식/임베딩/번역 모델 호출만 고정된 가짜 결과로 바꿔 모델 없이 나머지 경로를 측정
+#   --models real: 실제 모델 사용 (transformers/torch 와 모델 내려받기가 필요)
+# 사용 예:
+#   python benchmarks/bench_stages.py --sizes 1280x720 1920x1080 --durations 30 120 --output before.json
+#   python benchmarks/bench_stages.py --output after.json --compare before.json
+# ============================================================
+
+# 입력 코덱 → (ffmpeg 인코더, 추가 인자)
+CODECS = {
+    "h264": ("libx264", {"preset": "ultrafast"}),
+    "hevc": ("libx265", {"preset": "ultrafast", "x265-params": "log-level=error"}),
+    "mpeg4": ("mpeg4", {"q:v": 5}),
+}
+STAGES = ("cut_smart", "cut_reencode", "cut_fast", "subtitles", "translation", "transition", "pipeline")
+MODEL_MODES = ("stub", "real")
+# 같은 입력이면 항상 같은 결과가 나오도록 비트 단위 재현 옵션 사용
+BITEXACT = {"fflags": "+bitexact", "flags": "+bitexact"}
+# 합성 입력: SHOT_SECONDS 마다 색상이 바뀌는 샷, SPEECH_PERIOD 마다 SILENCE_SECONDS 의 무음
+SHOT_SECONDS = 5
+SPEECH_PERIOD = 4
+SILENCE_SECONDS = 1
+SUBJECT = "요리"
+TARGET_LANGUAGE = "en"
+# 가짜 음성 인식 결과 (주제와 관련된 문장과 관련 없는 문장을 번갈아)
+STUB_SENTENCES = ("오늘의 주제는 요리입니다 재료를 손질해 볼게요", "잠깐 다른 이야기를 하고 넘어가겠습니다")
+STUB_EMBED_DIM = 384
+
+
+def make_input(path, size, duration, codec, fps, gop):
+    encoder, extra = CODECS[codec]
+    v = ffmpeg.input(f"testsrc2=size={size}:rate={fps}:duration={duration},"
+                     f"hue=H=2*PI*floor(t/{SHOT_SECONDS})/7", f="lavfi")
+    a = ffmpeg.input(f"sine=frequency=440:sample_rate=48000:duration={duration},"
+                     f"volume=volume=0:enable='lt(mod(t,{SPEECH_PERIOD}),{SILENCE_SECONDS})'", f="lavfi")
+    media.run(ffmpeg.output(v, a, path, vcodec=encoder, g=gop, pix_fmt="yuv420p", acodec="aac",
+                            **extra, **BITEXACT))
+
+
+def make_clip(path, size, fps):
+    v = ffmpeg.input(f"smptebars=size={size}:rate={fps}:duration=1", f="lavfi")
+    media.run(ffmpeg.output(v, path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p", **BITEXACT))
+
+
+def install_stub_models():
+    """음성 인식/임베딩/번역 모델 호출만 가짜 결과로 바꿈 (나머지 단계 코드는 그대로 실행)"""
+    import numpy as np
+
+    import asr
+    import relevance
+    import silence_detect
+    import translate
+
+    def recognize(audio_batch, model_name=None, backend=None):
+        results = []
+        for audio in audio_batch:
+            length = len(audio) / silence_detect.SAMPLE_RATE
+            segments, t = [], 0.0
+            while t + 0.5 < length:
+                end = min(length, t + 2.0)
+                text = STUB_SENTENCES[len(segments) % len(STUB_SENTENCES)]
+                words = text.split()
+                step = (end - t) / len(words)
+                segments.append({"start": t, "end": end, "text": text, "confidence": 0.9,
+                                 "words": [{"start": t + i * step, "end": t + (i + 1) * step, "text": word,
+                                            "probability": 0.9} for i, word in enumerate(words)]})
+                t = end
+            results.append({"language": "ko", "segments": segments})
+        return results
+
+    def embed(texts, model_name=None):
+        # 같은 단어를 가진 문장끼리 가까운 결정적 임베딩
+        out = np.zeros((len(texts), STUB_EMBED_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                out[row, int(hashlib.sha1(word.encode("utf-8")).hexdigest(), 16) % STUB_EMBED_DIM] += 1
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+    asr.recognize = recognize
+    relevance.embed = embed
+    translate._run = lambda lines, source, target, backend, inference_backend: [f"[{target}] {line}"
+                                                                               for line in lines]
+
+
+class _Context:
+    job_id = "bench"
+
+    def report(self, *args, **kwargs):
+        pass
+
+
+def run_stage(name, src, clip, duration, workdir):
+    """name 단계를 실제 경로로 실행하고 출력 경로를 반환"""
+    import pipeline
+    import stages
+    from analysis_index import content_digest
+
+    out = os.path.join(workdir, f"{name}.mp4")
+    desired_length = duration / 2
+    if name.startswith("cut_"):
+        return stages.ai_cut_edit(src, SUBJECT, desired_length, out, mode=name[len("cut_"):])
+    if name == "subtitles":
+        return stages.ai_add_subtitles(src, None, "스타일 1", "#FFFFFF", 24, out)
+    if name == "translation":
+        return stages.ai_translate_video(src, TARGET_LANGUAGE, out)
+    if name == "transition":
+        return stages.insert_transition_video(src, clip, out)
+    params = {
+        "session_id": "bench", "inputs": [],
+        "video": {"digest": content_digest(src), "path": src},
+        "cut": {"subject": SUBJECT, "desired_length": desired_length, "mode": "smart", "remove_silence": True},
+        "subtitles": {"font_digest": None, "font_path": None, "style": "스타일 1", "color": "#FFFFFF", "size": 24},
+        "translation": {"target_language": TARGET_LANGUAGE},
+        "transition": {"digest": content_digest(clip), "path": clip},
+    }
+    return pipeline.run_pipeline(_Context(), params)
+
+
+def _worker(name, src, clip, duration, model_mode, queue):
+    try:
+        import metrics
+
+        if model_mode == "stub":
+            install_stub_models()
+        workdir = os.path.join(os.environ["VOCI_WORKSPACE"], "out")
+        os.makedirs(workdir, exist_ok=True)
+        with metrics.stage(f"bench:{name}") as span:
+            out = run_stage(name, src, clip, duration, workdir)
+        data = span.to_dict()
+        queue.put({"wall_seconds": data["wall_seconds"], "cpu_seconds": data["cpu_seconds"],
+                   "peak_rss_bytes": data["peak_rss_bytes"], "output_bytes": os.path.getsize(out)})
+    except Exception as e:
+        queue.put({"error": f"{e.__class__.__name__}: {str(e).splitlines()[0] if str(e) else ''}"})
+
+
+def run_once(name, src, clip, duration, model_mode):
+    """빈 workspace 를 쓰는 새 프로세스에서 한 번 실행"""
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as root:
+        env_root = os.environ.get("VOCI_WORKSPACE")
+        os.environ["VOCI_WORKSPACE"] = root
+        try:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_worker, args=(name, src, clip, duration, model_mode, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+        finally:
+            if env_root is None:
+                os.environ.pop("VOCI_WORKSPACE")
+            else:
+                os.environ["VOCI_WORKSPACE"] = env_root
+    return result
+
+
+def run_case(src, clip, name, duration, model_mode, repeat):
+    runs = []
+    for _ in range(repeat):
+        result = run_once(name, src, clip, duration, model_mode)
+        if "error" in result:
+            return result
+        runs.append(result)
+    best = min(runs, key=lambda r: r["wall_seconds"])
+    return {**best, "x_realtime": duration / best["wall_seconds"], "runs": runs}
+
+
+def environment():
+    def output(args):
+        try:
+            return subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    ffmpeg_version = output(["ffmpeg", "-version"])
+    return {
+        "commit": output(["git", "-C", os.path.dirname(os.path.abspath(__file__)), "rev-parse", "HEAD"]),
+        "ffmpeg": ffmpeg_version.splitlines()[0] if ffmpeg_version else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "x264_preset": media.X264_PRESET,
+        "timestamp": time.time(),
+    }
+
+
+def case_key(result):
+    return (result["size"], result["duration"], result["codec"], result["stage"])
+
+
+def compare(results, baseline_path):
+    """기준 결과 대비 x-realtime 비율 (1 보다 크면 빨라짐)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"] if "error" not in r}
+    rows = []
+    for result in results:
+        old = baseline.get(case_key(result))
+        if old is None or "error" in result:
+            continue
+        rows.append({"case": "/".join(str(k) for k in case_key(result)),
+                     "speedup": round(result["x_realtime"] / old["x_realtime"], 3),
+                     "peak_rss_ratio": round(result["peak_rss_bytes"] / max(old["peak_rss_bytes"], 1), 3),
+                     "size_ratio": round(result["output_bytes"] / max(old["output_bytes"], 1), 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 영상으로 편집 단계별 처리 속도/메모리/출력 크기 측정")
+    parser.add_argument("--sizes", nargs="+", default=["640x360", "1280x720"])
+    parser.add_argument("--durations", type=float, nargs="+", default=[20])
+    parser.add_argument("--codecs", nargs="+", default=["h264"], choices=sorted(CODECS))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--gop", type=int, default=60, help="입력 영상의 키프레임 간격 (프레임)")
+    parser.add_argument("--repeat", type=int, default=1, help="경우마다 반복 횟수 (가장 빠른 실행을 기록)")
+    parser.add_argument("--models", default="stub", choices=MODEL_MODES,
+                        help="stub: 모델 호출만 가짜 결과로 / real: 실제 음성 인식·임베딩·번역 모델")
+    parser.add_argument("--output", help="결과 JSON 경로 (없으면 표준 출력)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size, duration, codec in itertools.product(args.sizes, args.durations, args.codecs):
+            src = os.path.join(workdir, f"input-{size}-{duration:g}-{codec}.mp4")
+            clip = os.path.join(workdir, f"clip-{size}.mp4")
+            case = {"size": size, "duration": duration, "codec": codec}
+            try:
+                make_input(src, size, duration, codec, args.fps, args.gop)
+                if not os.path.exists(clip):
+                    make_clip(clip, size, args.fps)
+            except media.MediaError as e:
+                # 인코더가 없는 ffmpeg 빌드 등
+                results.extend({**case, "stage": name, "error": str(e).splitlines()[0]} for name in args.stages)
+                continue
+            for name in args.stages:
+                result = run_case(src, clip, name, duration, args.models, args.repeat)
+                results.append({**case, "stage": name, **result})
+                print(f"{size} {duration:g}s {codec} {name}: "
+                      + (f"{result['x_realtime']:.2f}x" if "error" not in result else result["error"]),
+                      file=sys.stderr)
+            os.remove(src)
+
+    report = {"environment": environment(), "fps": args.fps, "gop": args.gop, "models": args.models,
+              "results": results}
+    if args.compare:
+        report["comparison"] = {"baseline": args.compare, "cases": compare(results, args.compare)}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from storage import commit_temp, discard_temp, open_temp
+from workspace import get_workspace
+
+# ============================================================
+# 중단 후 이어서 실행하기 위한 체크포인트
+# - 작업 매니페스트: 단계가 끝날 때마다 완료된 단계의 캐시 키/경로를 원자적으로 기록
+#   (단계 결과 자체는 stage_cache 에 저장되므로 다시 실행하면 마지막 완료 단계부터 이어감)
+# - 조각 체크포인트: 구간별로 나눠 처리하는 긴 작업(병렬 인코딩, 스마트 렌더, 음성 인식)의
+#   완료된 조각을 입력/설정이 같은 동안 보관해, 다시 실행하면 남은 조각만 처리
+# ============================================================
+
+CHECKPOINT_DIRNAME = "checkpoints"
+MANIFEST_DIRNAME = "manifests"
+
+
+def write_json_atomic(path, data):
+    out, tmp_path = open_temp(os.path.dirname(path) or ".", prefix=".manifest-")
+    try:
+        out.write(json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+        return commit_temp(out, tmp_path, path)
+    except BaseException:
+        discard_temp(out, tmp_path)
+        raise
+
+
+def read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def manifest_path(job_id, workspace=None):
+    workspace = workspace or get_workspace()
+    return os.path.join(workspace.root, MANIFEST_DIRNAME, f"{job_id}.json")
+
+
+def file_identity(path):
+    """파일이 바뀌지 않았는지 확인하는 값 (경로, 크기, 수정 시각)"""
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+class Chunks:
+    """identity(입력과 설정)가 같은 실행 사이에 공유되는 조각 디렉터리
+
+    조각은 임시 이름으로 만든 뒤 rename 하므로 파일이 있으면 완료된 조각. 사용 중인 조각은 퇴출되지 않도록 고정
+    """
+
+    def __init__(self, identity, workspace=None):
+        self.workspace = workspace or get_workspace()
+        payload = json.dumps(identity, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        self.dir = os.path.join(self.workspace.root, CHECKPOINT_DIRNAME, digest[:2], digest)
+        self._pinned = []
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def done(self, name):
+        path = self.path(name)
+        if not os.path.exists(path):
+            return False
+        self._pin(path)
+        return True
+
+    def _pin(self, path):
+        self.workspace.acquire(path)
+        self._pinned.append(path)
+
+    def run(self, name, render):
+        """완료된 조각이 없을 때만 render(임시 경로) 를 실행하고 조각 경로를 반환"""
+        path = self.path(name)
+        if self.done(name):
+            return path
+        # 확장자로 형식을 정하는 ffmpeg 출력을 위해 확장자는 유지
+        tmp_path = os.path.join(self.dir, f".{uuid.uuid4().hex}-{name}")
+        with self.workspace.pinned(tmp_path):
+            try:
+                render(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._pin(path)
+        return path
+
+    def close(self, completed):
+        """completed 면 조각을 모두 지우고, 아니면 다음 실행을 위해 남겨 둠"""
+        self.workspace.release(*self._pinned)
+        self._pinned = []
+        if completed:
+            shutil.rmtree(self.dir, ignore_errors=True)
+        else:
+            os.utime(self.dir, (time.time(), time.time()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(exc_type is None)
+        return False
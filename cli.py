@@ -0,0 +1,207 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import metrics
+import quantize
+import translate
+from filtergraph import CUT_MODES
+from jobs import DEFAULT_WORKERS
+from pipeline import report_path, run_pipeline
+from stages import SUBTITLE_STYLES
+from storage import store_file
+from workspace import WorkspaceFullError, get_workspace
+
+# ============================================================
+# 일괄 처리 CLI - 브라우저 없이 디렉터리/목록 파일의 영상을 앱과 같은 파이프라인으로 편집
+# 사용 예:
+#   python cli.py videos/ --features cut subtitles --desired-length 60 --font NanumGothic.ttf -o out/
+#   python cli.py manifest.json --features cut translation --target-language en --jobs 4 -o out/
+# 목록 파일: JSON 배열 또는 JSON Lines. 각 항목은 {"video": 경로, ...옵션 덮어쓰기}
+# 한 프로세스 안에서 실행되므로 불러온 모델(models.get_model)은 모든 파일이 공유
+# ============================================================
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+FEATURES = ("cut", "subtitles", "translation", "transition")
+DEFAULT_FEATURES = ("cut", "subtitles")
+# 목록 파일에서 파일마다 바꿀 수 있는 옵션
+OPTION_NAMES = ("features", "subject", "desired_length", "cut_mode", "remove_silence", "font", "style", "color",
+                "size", "target_language", "transition")
+
+# 진행률 로그를 남기는 최소 간격 (초)
+LOG_INTERVAL = 5.0
+
+logger = logging.getLogger("voci.cli")
+
+
+class CliContext:
+    """jobs.JobContext 와 같은 report() 를 제공하고 진행 상황을 로그로 출력"""
+
+    def __init__(self, job_id, label):
+        self.job_id = job_id
+        self.label = label
+        self._last_report = 0.0
+
+    def report(self, progress, message=None, force=False):
+        now = time.time()
+        if not force and now - self._last_report < LOG_INTERVAL:
+            return
+        self._last_report = now
+        logger.info("%s: %3.0f%% %s", self.label, max(0.0, min(1.0, progress)) * 100, message or "")
+
+
+def load_items(source):
+    """디렉터리 또는 목록 파일에서 [{"video": 경로, ...}] 를 만듦"""
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(VIDEO_EXTENSIONS))
+        return [{"video": os.path.join(source, name)} for name in names]
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    items = []
+    for entry in entries:
+        item = {"video": entry} if isinstance(entry, str) else dict(entry)
+        unknown = set(item) - {"video", "output"} - set(OPTION_NAMES)
+        if unknown:
+            raise ValueError(f"알 수 없는 옵션: {', '.join(sorted(unknown))}")
+        # 목록 파일 기준 상대 경로
+        for key in ("video", "font", "transition", "output"):
+            if item.get(key) and not os.path.isabs(item[key]):
+                item[key] = os.path.join(base, item[key])
+        items.append(item)
+    return items
+
+
+class Ingester:
+    """로컬 파일을 작업 공간 저장소에 넣음. 같은 파일(폰트/전환 영상)은 한 번만 해시"""
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self._done = {}
+
+    def __call__(self, path):
+        key = os.path.abspath(path)
+        cached = self._done.get(key)
+        if cached is not None and os.path.exists(cached[1]):
+            return cached
+        self.workspace.reserve(os.path.getsize(path))
+        self._done[key] = store_file(path, self.workspace.store_dir)
+        return self._done[key]
+
+
+def build_params(session_id, item, ingest):
+    """앱의 submit_edit() 과 같은 형식의 params 를 만듦"""
+    digest, path = ingest(item["video"])
+    params = {"session_id": session_id, "video": {"digest": digest, "path": path}, "inputs": [path]}
+    features = item["features"]
+    if "cut" in features:
+        params["cut"] = {"subject": item["subject"], "desired_length": item["desired_length"],
+                         "mode": item["cut_mode"], "remove_silence": item["remove_silence"]}
+    if "subtitles" in features:
+        font_digest, font_path = ingest(item["font"]) if item.get("font") else (None, None)
+        if font_path:
+            params["inputs"].append(font_path)
+        params["subtitles"] = {"font_digest": font_digest, "font_path": font_path, "style": item["style"],
+                               "color": item["color"], "size": item["size"]}
+    if "translation" in features:
+        params["translation"] = {"target_language": item["target_language"]}
+    if "transition" in features:
+        if not item.get("transition"):
+            raise ValueError("전환 영상(--transition)을 지정해 주세요.")
+        transition_digest, transition_path = ingest(item["transition"])
+        params["inputs"].append(transition_path)
+        params["transition"] = {"digest": transition_digest, "path": transition_path}
+    return params
+
+
+def output_path_for(item, output_dir):
+    if item.get("output"):
+        return item["output"]
+    stem = os.path.splitext(os.path.basename(item["video"]))[0]
+    return os.path.join(output_dir, f"{stem}_edited.mp4")
+
+
+def process(item, params, output_path):
+    ctx = CliContext(uuid.uuid4().hex, os.path.basename(item["video"]))
+    result_path = run_pipeline(ctx, params)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    shutil.copyfile(result_path, output_path)
+    return ctx.job_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="영상 여러 개를 브라우저 없이 일괄 편집")
+    parser.add_argument("source", help="영상 디렉터리 또는 목록 파일 (JSON / JSON Lines)")
+    parser.add_argument("-o", "--output-dir", default="edited")
+    parser.add_argument("--features", nargs="+", default=list(DEFAULT_FEATURES), choices=FEATURES)
+    parser.add_argument("--subject", default="", help="살리고 싶은 주제")
+    parser.add_argument("--desired-length", type=float, default=60, help="원하는 영상 길이 (초)")
+    parser.add_argument("--cut-mode", default="smart", choices=CUT_MODES)
+    parser.add_argument("--keep-silence", dest="remove_silence", action="store_false",
+                        help="말이 없는 구간을 먼저 빼지 않음")
+    parser.add_argument("--font", help="자막 폰트 파일 (ttf, otf)")
+    parser.add_argument("--style", default="스타일 1", choices=sorted(SUBTITLE_STYLES))
+    parser.add_argument("--color", default="#FFFFFF")
+    parser.add_argument("--size", type=int, default=24)
+    parser.add_argument("--target-language", default="en")
+    parser.add_argument("--transition", help="삽입할 전환 영상")
+    parser.add_argument("--inference-backend", default=quantize.BACKEND, choices=quantize.BACKENDS,
+                        help="음성 인식/번역 모델 실행 방식")
+    parser.add_argument("--translate-backend", default=translate.BACKEND, choices=translate.BACKENDS,
+                        help="번역 방식 (marian/nllb: 오프라인 모델, google: 온라인)")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_WORKERS, help="동시에 처리할 파일 수")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    quantize.BACKEND = args.inference_backend
+    translate.BACKEND = args.translate_backend
+    metrics.start_server()
+
+    defaults = {name: getattr(args, name) for name in OPTION_NAMES}
+    items = [{**defaults, **item} for item in load_items(args.source)]
+    if not items:
+        logger.error("처리할 영상이 없습니다: %s", args.source)
+        return 1
+
+    workspace = get_workspace()
+    ingest = Ingester(workspace)
+    session_id = f"cli-{uuid.uuid4().hex}"
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs), thread_name_prefix="voci-cli") as pool:
+        futures = {}
+        for item in items:
+            try:
+                params = build_params(session_id, item, ingest)
+            except (OSError, ValueError, WorkspaceFullError) as e:
+                logger.error("%s: %s", item["video"], e)
+                failures += 1
+                continue
+            # 작업이 끝날 때 run_pipeline 이 고정을 해제
+            workspace.acquire(*params["inputs"])
+            futures[pool.submit(process, item, params, output_path_for(item, args.output_dir))] = item
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                job_id = future.result()
+            except Exception as e:
+                logger.exception("%s: 실패 - %s", item["video"], e)
+                failures += 1
+            else:
+                logger.info("%s: 완료 → %s (보고서: %s)", item["video"], output_path_for(item, args.output_dir),
+                            report_path(job_id))
+    logger.info("완료 %d / 실패 %d", len(items) - failures, failures)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
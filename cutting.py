@@ -0,0 +1,191 @@
+import bisect
+import os
+from functools import partial
+
+import ffmpeg
+
+import checkpoint
+import media
+import parallel_encode
+from analysis_index import content_digest
+
+# ============================================================
+# 재인코딩을 줄인 컷 편집
+# - fast: 컷 지점을 허용 오차 안의 가장 가까운 키프레임으로 옮기고 -c copy 로 이어 붙임
+# - smart: 컷 경계에 걸친 GOP 만 원본과 같은 프로파일로 재인코딩하고 나머지는 -c copy
+# ============================================================
+
+# 키프레임으로 옮길 때 허용하는 최대 이동 거리 (초)
+DEFAULT_SNAP_TOLERANCE = float(os.environ.get("VOCI_SNAP_TOLERANCE", "2.0"))
+
+# 스마트 렌더가 가능한 원본 코덱 (재인코딩 조각과 복사 조각의 비트스트림을 이어 붙일 수 있어야 함)
+SMART_CODECS = {"h264"}
+# 컷 지점과 키프레임 시각을 비교할 때의 허용 오차 (초)
+EPS = 1e-3
+# 이어 붙인 결과를 디코딩해 확인할 때 복사 조각 앞부분에서 디코딩하는 길이 (초). 재인코딩 조각은 전부 디코딩
+CHECK_SECONDS = 1.0
+CHECK_OUTPUT = os.environ.get("VOCI_SMART_CHECK", "1") == "1"
+# ffprobe 프로파일 이름 → libx264 -profile:v 값
+X264_PROFILES = {
+    "constrained baseline": "baseline",
+    "baseline": "baseline",
+    "main": "main",
+    "high": "high",
+    "high 10": "high10",
+    "high 4:2:2": "high422",
+    "high 4:4:4 predictive": "high444",
+}
+
+
+def _nearest(keyframes, t, tolerance):
+    i = bisect.bisect_left(keyframes, t)
+    candidates = [k for k in keyframes[max(i - 1, 0):i + 1] if abs(k - t) <= tolerance]
+    return min(candidates, key=lambda k: abs(k - t)) if candidates else None
+
+
+def snap_segments(segments, keyframes, tolerance=DEFAULT_SNAP_TOLERANCE, duration=None):
+    """구간 시작/끝을 키프레임으로 옮김
+
+    시작은 반드시 키프레임이어야 하므로 허용 오차 안에 없으면 직전 키프레임으로,
+    끝은 허용 오차 안의 키프레임이 있을 때만 옮김. 겹치게 된 구간은 합침
+    """
+    if not keyframes:
+        return [(float(s), float(e)) for s, e in segments]
+    snapped = []
+    for s, e in segments:
+        start = _nearest(keyframes, s, tolerance)
+        if start is None:
+            start = keyframes[max(bisect.bisect_right(keyframes, s) - 1, 0)]
+        end = _nearest(keyframes, e, tolerance)
+        if end is None or end <= start:
+            end = e
+        if duration is not None:
+            end = min(end, duration)
+        if end <= start:
+            continue
+        if snapped and start <= snapped[-1][1]:
+            snapped[-1] = (snapped[-1][0], max(snapped[-1][1], end))
+        else:
+            snapped.append((start, end))
+    return snapped
+
+
+def write_concat_list(path, input_path, segments):
+    source = os.path.abspath(input_path).replace("'", "'\\''")
+    with open(path, "w", encoding="utf-8") as f:
+        for s, e in segments:
+            f.write(f"file '{source}'\ninpoint {s:.6f}\noutpoint {e:.6f}\n")
+
+
+def fast_cut(input_path, segments, output_path, workdir):
+    """키프레임에 맞춘 segments 를 재인코딩 없이(-c copy) 이어 붙임"""
+    os.makedirs(workdir, exist_ok=True)
+    list_path = os.path.join(workdir, os.path.basename(output_path) + ".concat.txt")
+    write_concat_list(list_path, input_path, segments)
+    try:
+        stream = ffmpeg.input(list_path, f="concat", safe=0)
+        media.run(ffmpeg.output(stream, output_path, c="copy", avoid_negative_ts="make_zero",
+                                **media.MUX_ARGS))
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+class SmartCutError(media.MediaError):
+    """스마트 렌더 결과가 제대로 디코딩되지 않음 (전체 재인코딩으로 대신할 수 있음)"""
+
+
+def smart_supported(info):
+    return info.video_codec in SMART_CODECS
+
+
+def plan_smart_parts(segments, keyframes):
+    """각 구간을 [("encode"|"copy", 시작, 끝), ...] 조각으로 나눔
+
+    구간 안쪽의 첫 키프레임부터 마지막 키프레임까지는 복사하고, 그 앞뒤 자투리만 재인코딩
+    """
+    parts = []
+    for s, e in segments:
+        i = bisect.bisect_left(keyframes, s - EPS)
+        j = bisect.bisect_right(keyframes, e + EPS) - 1
+        if i >= len(keyframes) or j <= i:
+            parts.append(("encode", s, e))
+            continue
+        first, last = keyframes[i], keyframes[j]
+        # 끝이 키프레임과 겹치면 끝까지 복사 (끝 다음 GOP 는 포함하지 않음)
+        if abs(e - last) <= EPS:
+            last = e
+        if first - s > EPS:
+            parts.append(("encode", s, first))
+        parts.append(("copy", first, last))
+        if e - last > EPS:
+            parts.append(("encode", last, e))
+    return parts
+
+
+def _profile_args(info):
+    """원본과 이어 붙일 수 있도록 같은 프로파일/레벨/픽셀 형식으로 인코딩하는 인자"""
+    args = {"vcodec": "libx264", "preset": media.X264_PRESET, "crf": media.X264_CRF,
+            "pix_fmt": info.pix_fmt or "yuv420p"}
+    profile = X264_PROFILES.get((info.video.get("profile") or "").lower())
+    if profile:
+        args["profile:v"] = profile
+    level = info.video.get("level")
+    if isinstance(level, int) and level > 0:
+        args["level"] = f"{level / 10:.1f}"
+    return args
+
+
+def _render_part(input_path, part, encode_args, out_path):
+    kind, start, end = part
+    inp = ffmpeg.input(input_path, ss=start, t=end - start)
+    if kind == "copy":
+        # 키프레임에서 시작하므로 입력 탐색 후 그대로 복사. SPS/PPS 를 조각마다 싣기 위해 Annex B 로 변환하고,
+        # 복사는 디코딩 순서로 자르므로 다음 GOP 의 키프레임까지 딸려 오는 패킷은 표시 시각으로 걸러냄
+        bsf = f"h264_mp4toannexb,noise=drop='gte((pts-startpts)*tb\\,{end - start - EPS:.6f})'"
+        out = ffmpeg.output(inp.video, out_path, f="nut", c="copy", **{"bsf:v": bsf})
+    else:
+        # NUT 은 SPS/PPS 를 헤더에만 두므로 키프레임마다 비트스트림에도 넣어 줌
+        out = ffmpeg.output(inp.video, out_path, f="nut", **encode_args, **{"bsf:v": "dump_extra"})
+    media.run(out)
+
+
+def check_windows(parts):
+    """이어 붙인 결과에서 디코딩해 볼 [(시작, 길이)]. 조각마다 키프레임에서 시작하므로 각 조각의 앞부분이 이음매"""
+    windows, t = [], 0.0
+    for kind, start, end in parts:
+        length = end - start
+        windows.append((t, length if kind == "encode" else min(length, CHECK_SECONDS)))
+        t += length
+    return windows
+
+
+def smart_cut(input_path, segments, output_path, workdir, keyframes=None, workers=None):
+    """컷 경계의 GOP 만 재인코딩하고 나머지는 복사해서 segments 를 프레임 단위로 정확하게 이어 붙임"""
+    info = media.media_info(input_path)
+    if not smart_supported(info):
+        raise media.MediaError(f"스마트 렌더를 지원하지 않는 코덱입니다: {info.video_codec}")
+    if keyframes is None:
+        keyframes = media.keyframe_times(input_path)
+    parts = plan_smart_parts(segments, keyframes)
+    encode_args = _profile_args(info)
+
+    # 입력과 설정이 같으면 중단된 이전 실행에서 완료된 조각을 재사용
+    # (입력은 내용 해시로 구분. 작업/캐시 조회마다 수정 시각이 바뀌므로 수정 시각은 쓰지 않음)
+    identity = ["smart_cut", content_digest(input_path), segments, parts, encode_args,
+                media.AUDIO_ENCODE_ARGS]
+    with checkpoint.Chunks(identity) as chunks:
+        names = [f"{i:05d}.nut" for i in range(len(parts))]
+        renders = {"audio.m4a": partial(media.encode_audio_segments, input_path, segments, info.has_audio)}
+        renders.update((name, partial(_render_part, input_path, part, encode_args)) for part, name in zip(parts, names))
+        parallel_encode.render_chunks(chunks, renders, workers)
+        # 재인코딩 조각의 SPS/PPS 는 원본과 다를 수 있어 조각마다 비트스트림 안에 실려 있음
+        # → 파라미터 세트가 바뀔 수 있음을 나타내는 avc3 로 표시 (avc1 은 헤더의 avcC 하나만 쓰는 것으로 간주됨)
+        media.concat_copy([chunks.path(name) for name in names], [end - start for _, start, end in parts],
+                          chunks.path("audio.m4a"), output_path, workdir, **{"tag:v": "avc3"})
+    if CHECK_OUTPUT:
+        try:
+            media.check_decode(output_path, check_windows(parts))
+        except media.MediaError as e:
+            raise SmartCutError(f"스마트 렌더 결과를 디코딩할 수 없습니다.\n{e}") from e
+    return output_path
@@ -0,0 +1,396 @@
+import hashlib
+import logging
+import os
+import uuid
+
+import ffmpeg
+
+import cutting
+import media
+import parallel_encode
+
+# ============================================================
+# 단계 → 하나의 ffmpeg 필터 그래프
+# - 선택한 단계(컷, 자막, 번역 자막, 전환 영상)를 필터로 표현해
+#   한 번 디코딩 / 한 번 인코딩으로 처리
+# - 재인코딩하지 않는 컷(fast/smart)은 혼자일 때만 따로 실행하고, 재인코딩하는 단계와 함께면 같은 그래프에서 자름
+# - 자막 시각은 원본 영상 기준으로 주고, 앞선 컷 단계를 거쳐 출력 시각으로 변환
+# ============================================================
+
+DEFAULT_TRANSITION_SECONDS = 0.5
+# 컷 구간마다 입력을 따로 열어(-ss/-t) 필요한 부분만 디코딩. 구간이 너무 많으면 trim 사용
+MAX_SEEK_INPUTS = 64
+# 이보다 짧은 전환은 xfade 대신 이어 붙이기
+MIN_XFADE_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def silences(durations):
+    """길이별 무음 스트림 목록. 같은 입력 노드를 여러 번 쓰지 않도록 하나를 만들어 나눔"""
+    if len(durations) == 1:
+        return [media.silence(durations[0])]
+    parts = media.silence(sum(durations)).filter_multi_output("asplit", len(durations))
+    streams, t = [], 0.0
+    for i, d in enumerate(durations):
+        streams.append(parts[i].filter("atrim", start=t, end=t + d).filter("asetpts", "PTS-STARTPTS"))
+        t += d
+    return streams
+
+
+def split_streams(v, a, n):
+    """같은 스트림을 n 번 쓸 때 split/asplit 으로 나눔"""
+    if n == 1:
+        return [v], [a]
+    vs = v.filter_multi_output("split", n)
+    as_ = a.filter_multi_output("asplit", n)
+    return [vs[i] for i in range(n)], [as_[i] for i in range(n)]
+
+
+class GraphContext:
+    def __init__(self, input_path, info, workdir, prior_steps=()):
+        self.input_path = input_path
+        self.info = info
+        self.workdir = workdir
+        self.duration = info.duration
+        # 지금까지 적용된 컷 (캐시된 앞 단계 포함). 자막 시각 변환에 사용
+        self.cuts = [s for s in prior_steps if isinstance(s, CutStep)]
+        # 출력 타임라인에서 컷 구간이 이어지는 시각 (전환 영상 삽입 위치)
+        self.joins = self.cuts[-1].join_times() if self.cuts else []
+        for step in prior_steps:
+            if isinstance(step, TransitionStep):
+                self.joins = []
+        # v/a 가 아직 원본 입력 그대로인지 (컷 단계가 입력 탐색으로 처리할 수 있는지)
+        self.raw = True
+
+    def source_streams(self):
+        inp = ffmpeg.input(self.input_path)
+        a = inp.audio if self.info.has_audio else media.silence(self.duration)
+        return inp.video, media.normalize_audio(a)
+
+    def map_cues(self, cues):
+        for cut in self.cuts:
+            mapped = []
+            for start, end, text in cues:
+                mapped.extend((s, e, text) for s, e in cut.map_interval(start, end))
+            cues = mapped
+        return cues
+
+
+# ============================================================
+# 단계(step) 정의
+# ============================================================
+# 컷 방식: reencode(필터 그래프에서 재인코딩), fast(키프레임에 맞춰 -c copy)
+CUT_MODES = ("reencode", "fast", "smart")
+
+
+class CutStep:
+    def __init__(self, segments, mode="reencode"):
+        if mode not in CUT_MODES:
+            raise ValueError(f"알 수 없는 컷 방식: {mode}")
+        self.segments = [(float(s), float(e)) for s, e in segments if e > s]
+        self.mode = mode
+        # 재인코딩하지 않는 방식은 그래프에 합치지 않고 따로 실행 (결과는 손실 없는 중간 파일)
+        self.fusable = mode == "reencode"
+
+    @property
+    def duration(self):
+        return sum(e - s for s, e in self.segments)
+
+    def join_times(self):
+        joins, t = [], 0.0
+        for s, e in self.segments[:-1]:
+            t += e - s
+            joins.append(t)
+        return joins
+
+    def map_interval(self, start, end):
+        mapped, offset = [], 0.0
+        for s, e in self.segments:
+            lo, hi = max(start, s), min(end, e)
+            if hi > lo:
+                mapped.append((offset + lo - s, offset + hi - s))
+            offset += e - s
+        return mapped
+
+    def apply(self, ctx, v, a):
+        if not self.segments:
+            raise media.MediaError("남길 구간이 없습니다.")
+        pieces = []
+        if ctx.raw and len(self.segments) <= MAX_SEEK_INPUTS:
+            # 구간별로 입력을 열어 필요한 부분만 디코딩
+            quiet = None if ctx.info.has_audio else silences([e - s for s, e in self.segments])
+            for i, (s, e) in enumerate(self.segments):
+                inp = ffmpeg.input(ctx.input_path, ss=s, t=e - s)
+                pa = media.normalize_audio(inp.audio) if quiet is None else quiet[i]
+                pieces.append(inp.video.filter("setpts", "PTS-STARTPTS"))
+                pieces.append(pa.filter("asetpts", "PTS-STARTPTS"))
+        else:
+            vs, as_ = split_streams(v, a, len(self.segments))
+            for (s, e), pv, pa in zip(self.segments, vs, as_):
+                pieces.append(pv.trim(start=s, end=e).setpts("PTS-STARTPTS"))
+                pieces.append(pa.filter("atrim", start=s, end=e).filter("asetpts", "PTS-STARTPTS"))
+        if len(pieces) == 2:
+            v, a = pieces
+        else:
+            joined = ffmpeg.concat(*pieces, v=1, a=1).node
+            v, a = joined[0], joined[1]
+        ctx.raw = False
+        ctx.cuts.append(self)
+        ctx.duration = self.duration
+        ctx.joins = self.join_times()
+        return v, a
+
+    def decoded(self):
+        """같은 구간을 필터 그래프에서 자르는 단계 (재인코딩하는 단계와 한 그래프로 묶을 때 사용)"""
+        return self if self.fusable else CutStep(self.segments)
+
+    def render(self, input_path, output_path, workdir, prior_steps=()):
+        if not self.segments:
+            raise media.MediaError("남길 구간이 없습니다.")
+        if self.mode == "fast":
+            return cutting.fast_cut(input_path, self.segments, output_path, workdir)
+        if cutting.smart_supported(media.media_info(input_path)):
+            try:
+                return cutting.smart_cut(input_path, self.segments, output_path, workdir)
+            except cutting.SmartCutError:
+                logger.warning("스마트 렌더 결과 검사 실패. 전체를 재인코딩합니다: %s", input_path, exc_info=True)
+        # 이어 붙일 수 없는 코덱이거나 이어 붙인 결과가 깨졌으면 전체를 재인코딩
+        stream, duration = build_graph(input_path, [CutStep(self.segments)], output_path, workdir, prior_steps)
+        media.run(stream, duration)
+        return output_path
+
+
+class SubtitleStep:
+    fusable = True
+
+    def __init__(self, cues, style, font_dir=None, name="subtitles"):
+        # cues: [(시작 초, 끝 초, 텍스트)] - 원본 영상 기준 시각
+        self.cues = list(cues)
+        self.style = dict(style)
+        self.font_dir = font_dir
+        self.name = name
+
+    def frame_filter(self, ctx):
+        """출력 타임라인 기준 자막 필터 (이름, 위치 인자, 키워드 인자). 넣을 자막이 없으면 None"""
+        cues = ctx.map_cues(self.cues)
+        if not cues:
+            return None
+        # 내용이 같으면 같은 경로를 쓰도록 내용 해시로 이름을 지음 (중단 후 재실행 시 완료된 조각 재사용)
+        document = ass_document(cues, self.style, ctx.info.width, ctx.info.height)
+        digest = hashlib.sha256(document.encode("utf-8")).hexdigest()[:16]
+        ass_path = os.path.join(ctx.workdir, f"{self.name}-{digest}.ass")
+        if not os.path.exists(ass_path):
+            tmp_path = f"{ass_path}.{uuid.uuid4().hex}.part"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(document)
+            os.replace(tmp_path, ass_path)
+        kwargs = {"fontsdir": self.font_dir} if self.font_dir else {}
+        return "subtitles", (ass_path,), kwargs
+
+    def apply(self, ctx, v, a):
+        spec = self.frame_filter(ctx)
+        if spec is None:
+            return v, a
+        name, args, kwargs = spec
+        ctx.raw = False
+        return v.filter(name, *args, **kwargs), a
+
+
+class TransitionStep:
+    fusable = True
+
+    def __init__(self, clip_path, seconds=DEFAULT_TRANSITION_SECONDS):
+        self.clip_path = clip_path
+        self.seconds = seconds
+
+    def _normalize_video(self, ctx, v):
+        # xfade 는 두 입력의 해상도, 프레임레이트, 타임베이스가 같아야 함
+        info = ctx.info
+        return (
+            v.filter("scale", info.width, info.height, force_original_aspect_ratio="decrease")
+            .filter("pad", info.width, info.height, "(ow-iw)/2", "(oh-ih)/2")
+            .filter("setsar", 1)
+            .filter("fps", str(info.fps))
+            .filter("format", "yuv420p")
+        )
+
+    def apply(self, ctx, v, a):
+        clip_info = media.media_info(self.clip_path)
+        bounds = [0.0] + list(ctx.joins) + [ctx.duration]
+        n = len(bounds) - 1
+        vs, as_ = split_streams(v, a, n)
+        pieces = [
+            (self._normalize_video(ctx, pv.trim(start=s, end=e).setpts("PTS-STARTPTS")),
+             pa.filter("atrim", start=s, end=e).filter("asetpts", "PTS-STARTPTS"),
+             e - s)
+            for (s, e), pv, pa in zip(zip(bounds[:-1], bounds[1:]), vs, as_)
+        ]
+
+        # 전환 영상은 한 번만 디코딩하고 필요한 횟수만큼 나눠 씀
+        uses = max(n - 1, 1)
+        clip = ffmpeg.input(self.clip_path)
+        clip_audio = media.normalize_audio(clip.audio) if clip_info.has_audio else media.silence(clip_info.duration)
+        clip_vs, clip_as = split_streams(self._normalize_video(ctx, clip.video), clip_audio, uses)
+        clips = [(cv, ca, clip_info.duration) for cv, ca in zip(clip_vs, clip_as)]
+
+        # 컷 경계마다 전환 영상을 끼우고, 컷이 없으면 맨 앞에 넣음
+        if n > 1:
+            items = [pieces[0]]
+            for c, piece in zip(clips, pieces[1:]):
+                items.extend([c, piece])
+        else:
+            items = [clips[0], pieces[0]]
+
+        fade = min(self.seconds, min(d for _, _, d in items) / 2)
+        if fade < MIN_XFADE_SECONDS:
+            joined = ffmpeg.concat(*[s for sv, sa, _ in items for s in (sv, sa)], v=1, a=1).node
+            v, a = joined[0], joined[1]
+            total = sum(d for _, _, d in items)
+        else:
+            v, a, total = items[0]
+            for nv, na, d in items[1:]:
+                v = ffmpeg.filter([v, nv], "xfade", transition="fade", duration=fade, offset=total - fade)
+                a = ffmpeg.filter([a, na], "acrossfade", d=fade)
+                total += d - fade
+        ctx.raw = False
+        ctx.duration = total
+        ctx.joins = []
+        return v, a
+
+
+# ============================================================
+# ASS 자막 파일 작성
+# ============================================================
+ASS_STYLE_FIELDS = [
+    ("Fontname", "Arial"), ("Fontsize", 24), ("PrimaryColour", "&H00FFFFFF"), ("SecondaryColour", "&H000000FF"),
+    ("OutlineColour", "&H00000000"), ("BackColour", "&H80000000"), ("Bold", 0), ("Italic", 0), ("Underline", 0),
+    ("StrikeOut", 0), ("ScaleX", 100), ("ScaleY", 100), ("Spacing", 0), ("Angle", 0), ("BorderStyle", 1),
+    ("Outline", 2), ("Shadow", 0), ("Alignment", 2), ("MarginL", 20), ("MarginR", 20), ("MarginV", 30),
+    ("Encoding", 1),
+]
+
+
+def _ass_time(t):
+    cs = int(round(max(t, 0.0) * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _ass_text(text):
+    return text.replace("{", "\\{").replace("}", "\\}").replace("\r", "").replace("\n", "\\N")
+
+
+def ass_document(cues, style, width, height):
+    """cues 를 style(ASS 스타일 필드 dict) 로 PlayRes = 영상 해상도 인 ASS 문서로 만듦"""
+    fields = [(k, style.get(k, default)) for k, default in ASS_STYLE_FIELDS]
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, " + ", ".join(k for k, _ in fields),
+        "Style: Default, " + ", ".join(str(v) for _, v in fields),
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, text in sorted(cues):
+        lines.append(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{_ass_text(text)}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+# 그래프 컴파일 / 실행
+# ============================================================
+def build_graph(input_path, steps, output_path, workdir, prior_steps=()):
+    """(ffmpeg-python 출력 스트림, 예상 출력 길이 초) 를 반환"""
+    info = media.media_info(input_path)
+    ctx = GraphContext(input_path, info, workdir, prior_steps)
+    v, a = ctx.source_streams()
+    for step in steps:
+        v, a = step.apply(ctx, v, a)
+    out = ffmpeg.output(
+        v, a, output_path, **media.VIDEO_ENCODE_ARGS, **media.AUDIO_ENCODE_ARGS, **media.MUX_ARGS
+    )
+    return out, ctx.duration
+
+
+def compile_graph(input_path, steps, output_path, workdir, prior_steps=()):
+    return build_graph(input_path, steps, output_path, workdir, prior_steps)[0]
+
+
+def render_parallel(input_path, steps, output_path, workdir, prior_steps=()):
+    """컷 + 자막처럼 조각별로 나눠 인코딩할 수 있는 단계면 병렬 인코딩하고 True, 아니면 False"""
+    info = media.media_info(input_path)
+    ctx = GraphContext(input_path, info, workdir, prior_steps)
+    segments, filters = [(0.0, info.duration)], []
+    for i, step in enumerate(steps):
+        if isinstance(step, CutStep) and i == 0:
+            segments = step.segments
+            ctx.cuts.append(step)
+            ctx.duration = step.duration
+        elif isinstance(step, SubtitleStep):
+            spec = step.frame_filter(ctx)
+            if spec is not None:
+                filters.append(spec)
+        else:
+            # 전환 영상(xfade)은 조각 경계를 넘나들어 나눌 수 없음
+            return False
+    parallel_encode.encode(input_path, output_path, segments, filters, workdir, has_audio=info.has_audio)
+    return True
+
+
+def joinable(group, step):
+    """step 을 group(연속된 단계 목록)과 한 필터 그래프로 묶을 수 있는지
+
+    재인코딩하지 않는 컷(fast/smart)도 재인코딩하는 단계와 함께 실행하면 어차피 전체를 다시 인코딩하므로
+    같은 구간을 그래프에서 자르는 단계(decoded())로 바꿔 묶음. 재인코딩하는 단계가 없으면 따로 복사 컷
+    """
+    return step.fusable or any(s.fusable for s in group)
+
+
+def group_steps(steps):
+    """한 필터 그래프로 실행할 단계끼리 묶음. 여럿이 묶인 그룹의 fast/smart 컷은 decoded() 로 바꿈"""
+    groups = []
+    for step in steps:
+        if groups and joinable(groups[-1], step):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+    return [[step if step.fusable else step.decoded() for step in group] if len(group) > 1 else group
+            for group in groups]
+
+
+def render_steps(input_path, steps, output_path, workdir, prior_steps=()):
+    """steps 를 가능한 한 하나의 그래프로 묶어 실행. 그룹이 여러 개일 때만 중간 파일 생성"""
+    os.makedirs(workdir, exist_ok=True)
+    groups = group_steps(steps)
+    done = list(prior_steps)
+    current = input_path
+    intermediates = []
+    try:
+        for i, group in enumerate(groups):
+            last = i == len(groups) - 1
+            out = output_path if last else os.path.join(workdir, f"intermediate-{uuid.uuid4().hex}.mp4")
+            if group[0].fusable:
+                if not (parallel_encode.ENABLED and render_parallel(current, group, out, workdir, done)):
+                    stream, duration = build_graph(current, group, out, workdir, done)
+                    media.run(stream, duration)
+            else:
+                group[0].render(current, out, workdir, done)
+            if not last:
+                intermediates.append(out)
+            done.extend(group)
+            current = out
+    finally:
+        for path in intermediates:
+            if os.path.exists(path):
+                os.remove(path)
+    return output_path
@@ -0,0 +1,149 @@
+import collections
+import os
+import threading
+
+import ffmpeg
+import numpy as np
+
+import media
+
+# ============================================================
+# 분석용 프레임 추출 (장면 점수, 얼굴 유무, 썸네일 등)
+# - keyframes: 키프레임만 디코딩 (-skip_frame nokey). 나머지 프레임은 디코딩하지 않으므로 비용이 키프레임 수에 비례
+# - every: N 프레임마다 한 장. B 프레임은 디코딩하지 않고 (-skip_frame bidir) fps 필터로 간격을 맞춤
+#   (참조 프레임은 디코딩해야 하므로 간격이 키프레임 간격보다 길면 keyframes 가 훨씬 빠름)
+# - 축소는 디코딩한 프로세스 안에서 바로 하고 (지원하는 코덱은 디코더의 lowres 로 디코딩 해상도 자체를 낮춤)
+#   미리 할당한 NumPy 배열 하나에 묶음(batch)으로 바로 읽어 들임
+# - 프레임 시각은 디코딩된 프레임의 pts (metadata 필터가 별도 파이프로 프레임마다 출력)
+# ============================================================
+
+SAMPLE_WIDTH = int(os.environ.get("VOCI_SAMPLE_WIDTH", "160"))
+BATCH_FRAMES = 64
+MODES = ("keyframes", "every")
+# 디코더 lowres(1/2, 1/4, 1/8 해상도 디코딩)를 지원하는 코덱
+LOWRES_CODECS = {"mjpeg", "mpeg1video", "mpeg2video", "mpeg4", "h263"}
+MAX_LOWRES = 3
+# 추출 방식이 바뀌면 올려 추출한 프레임으로 계산해 색인에 저장한 결과를 무효화
+SAMPLER_VERSION = 2
+
+# frames: (n, 높이, 너비, 3) uint8, times: (n,) 초. 둘 다 미리 할당한 버퍼의 앞부분
+Batch = collections.namedtuple("Batch", "frames times")
+
+
+def sample_size(info, width=SAMPLE_WIDTH):
+    width = min(width, info.width) // 2 * 2
+    height = max(2, int(round(width * info.height / info.width / 2)) * 2)
+    return width, height
+
+
+def _lowres(info, width):
+    """원본 너비에서 width 로 줄일 때 디코더가 대신 줄일 수 있는 단계 (0: 사용 안 함)"""
+    if info.video_codec not in LOWRES_CODECS:
+        return 0
+    level = 0
+    while level < MAX_LOWRES and info.width >> (level + 1) >= width:
+        level += 1
+    return level
+
+
+class _FrameTimes:
+    """ffmpeg 의 metadata 필터가 파이프에 쓰는 프레임별 pts_time 을 읽어 모음 (디코딩된 프레임의 실제 시각)"""
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.times = []
+        self.done = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        # 파이프를 비워 주지 않으면 ffmpeg 가 쓰다가 멈추므로 프레임을 읽는 쪽과 따로 계속 읽음
+        with open(self.read_fd, "rb") as f:
+            for line in f:
+                key, _, value = line.decode("ascii", "replace").partition("pts_time:")
+                if key.startswith("frame:"):
+                    with self._cond:
+                        self.times.append(float(value))
+                        self._cond.notify_all()
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def take(self, start, count):
+        """start 번째부터 count 개 프레임의 시각. 시각은 프레임이 stdout 에 나오기 전에 써지므로 곧바로 도착함"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.times) >= start + count or self.done)
+            return self.times[start:start + count]
+
+    def close(self):
+        self._thread.join()
+
+
+def iter_batches(path, mode="keyframes", every=30, width=SAMPLE_WIDTH, batch_frames=BATCH_FRAMES, info=None,
+                 skip_bframes=None):
+    """추출한 프레임을 Batch 로 돌려줌. 같은 버퍼를 재사용하므로 다음 묶음을 받기 전에 다 써야 함 (보관하려면 복사)
+
+    times 는 디코딩된 프레임의 pts (키프레임 목록을 미리 읽어 짝짓지 않으므로 플래그와 실제 디코딩 결과가 달라도 맞음)
+    skip_bframes: B 프레임을 디코딩하지 않을지 (every 모드, 기본은 every > 1 일 때). 건너뛴 자리는 fps 필터가 앞 프레임으로 채움
+    """
+    if mode not in MODES:
+        raise ValueError(f"지원하지 않는 추출 방식: {mode}")
+    info = info or media.media_info(path)
+    width, height = sample_size(info, width)
+    input_args = {"skip_loop_filter": "all"}
+    lowres = _lowres(info, width)
+    if lowres:
+        input_args["lowres"] = lowres
+    rate, output_args = None, {}
+    if mode == "keyframes":
+        input_args["skip_frame"] = "nokey"
+        output_args["fps_mode"] = "passthrough"
+    else:
+        if every > 1 if skip_bframes is None else skip_bframes:
+            input_args["skip_frame"] = "bidir"
+        rate = str(info.fps / max(1, int(every)))
+    v = ffmpeg.input(path, **input_args).video
+    # 프레임을 버리는 fps 필터는 축소 전에, 건너뛴 자리를 복제만 하는 경우(every=1)는 축소 후에 (복제 프레임은 축소하지 않음)
+    if rate and every > 1:
+        v = v.filter("fps", fps=rate)
+    v = v.filter("scale", width, height, flags="area")
+    if rate and every <= 1:
+        v = v.filter("fps", fps=rate)
+    frame_times = _FrameTimes()
+    # print 는 메타데이터가 있는 프레임만 출력하므로 먼저 표시를 하나 붙임
+    # direct: 줄마다 바로 써서 프레임이 stdout 에 나오기 전에 시각이 도착하도록 (버퍼링하면 서로 기다리다 멈춤)
+    v = (v.filter("metadata", mode="add", key="voci.sample", value="1")
+         .filter("metadata", mode="print", file=f"/dev/fd/{frame_times.write_fd}", direct=1))
+    stream = ffmpeg.output(v, "pipe:1", f="rawvideo", pix_fmt="rgb24", **output_args)
+
+    frames = np.empty((batch_frames, height, width, 3), dtype=np.uint8)
+    frame_bytes = frames[0].nbytes
+    batch_times = np.empty(batch_frames, dtype=np.float64)
+    index = 0
+    blocks = media.iter_output(stream, frames.nbytes, buffer=frames, pass_fds=(frame_times.write_fd,))
+    try:
+        for block in blocks:
+            count = len(block) // frame_bytes
+            times = frame_times.take(index, count)
+            # 시각을 받지 못한 프레임(ffmpeg 가 도중에 끝남)은 버림
+            count = len(times)
+            batch_times[:count] = times
+            index += count
+            if count:
+                yield Batch(frames[:count], batch_times[:count])
+    finally:
+        # 중간에 그만 읽으면 ffmpeg 를 먼저 끝내야 시각 파이프가 닫힘
+        blocks.close()
+        frame_times.close()
+
+
+def sample(path, mode="keyframes", every=30, width=SAMPLE_WIDTH, info=None):
+    """추출한 프레임 전체를 한 번에 (frames, times) 로 반환 (짧은 영상이나 썸네일용)"""
+    parts = [(batch.frames.copy(), batch.times.copy())
+             for batch in iter_batches(path, mode, every, width, info=info)]
+    if not parts:
+        info = info or media.media_info(path)
+        width, height = sample_size(info, width)
+        return np.empty((0, height, width, 3), dtype=np.uint8), np.empty(0, dtype=np.float64)
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from workspace import get_workspace
+
+# ============================================================
+# 백그라운드 작업 큐
+# - 편집 파이프라인을 Streamlit 스크립트 스레드가 아닌 작업자 스레드 풀에서 실행
+# - 작업 기록(queued/running/done/failed, 진행률, 결과)은 SQLite 에 저장되어
+#   브라우저를 닫거나 새로고침해도 작업이 계속되고 다시 조회할 수 있음
+# ============================================================
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+DEFAULT_WORKERS = int(os.environ.get("VOCI_JOB_WORKERS", "2"))
+# 진행률 기록이 너무 잦으면 DB 쓰기가 늘어나므로 최소 간격을 둠
+PROGRESS_INTERVAL = 0.5
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("id", "session_id", "status", "progress", "message", "params", "result_path", "error",
+            "created_at", "updated_at")
+
+
+class JobStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    params TEXT,
+                    result_path TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created_at)")
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        return job
+
+    def create(self, session_id, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, session_id, status, progress, message, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, 0, ?, ?, ?, ?)",
+                (job_id, session_id, QUEUED, "대기 중", json.dumps(params, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def list_for_session(self, session_id, limit=10):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE session_id = ? ORDER BY created_at DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def interrupted(self):
+        """이전 프로세스에서 끝나지 못한 작업 (생성 순)"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))}) "
+                "ORDER BY created_at",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def mark_interrupted(self):
+        """이전 프로세스에서 끝나지 못한 작업을 실패로 표시"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+                (FAILED, "서버 재시작으로 작업이 중단되었습니다.", time.time(), *ACTIVE_STATUSES),
+            )
+
+
+class JobContext:
+    """작업 함수에 전달되어 진행 상황을 기록하는 객체"""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self._last_report = 0.0
+
+    def report(self, progress, message=None, force=False):
+        now = time.time()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        fields = {"progress": max(0.0, min(1.0, float(progress)))}
+        if message is not None:
+            fields["message"] = message
+        self.store.update(self.job_id, **fields)
+
+
+class JobQueue:
+    def __init__(self, store, max_workers=DEFAULT_WORKERS):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voci-job")
+
+    def submit(self, session_id, params, fn):
+        """fn(ctx, params) 를 작업자 스레드에서 실행. fn 은 결과 파일 경로를 반환"""
+        job_id = self.store.create(session_id, params)
+        self._executor.submit(self._run, job_id, params, fn)
+        return job_id
+
+    def resume(self, job, fn):
+        """저장된 params 로 중단된 작업을 같은 id 로 다시 실행"""
+        self.store.update(job["id"], status=QUEUED, message="재시작 후 이어서 실행 대기 중")
+        self._executor.submit(self._run, job["id"], job["params"], fn)
+        return job["id"]
+
+    def _run(self, job_id, params, fn):
+        ctx = JobContext(self.store, job_id)
+        self.store.update(job_id, status=RUNNING, message="시작")
+        try:
+            result_path = fn(ctx, params)
+        except Exception as e:
+            logger.exception("job %s failed", job_id)
+            self.store.update(job_id, status=FAILED, error=str(e) or e.__class__.__name__)
+        else:
+            self.store.update(job_id, status=DONE, progress=1.0, message="완료", result_path=result_path)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(resume_fn=None):
+    """프로세스당 하나의 작업 큐 (Streamlit 세션/재실행과 무관하게 유지)
+
+    처음 만들 때 resume_fn 이 있으면 이전 프로세스에서 중단된 작업을 resume_fn 으로 다시 실행하고,
+    없으면 실패로 표시
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            store = JobStore(os.path.join(get_workspace().root, "jobs.db"))
+            queue = JobQueue(store)
+            if resume_fn is None:
+                store.mark_interrupted()
+            else:
+                for job in store.interrupted():
+                    logger.info("resuming interrupted job %s", job["id"])
+                    queue.resume(job, resume_fn)
+            _job_queue = queue
+        return _job_queue
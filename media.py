@@ -0,0 +1,282 @@
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from fractions import Fraction
+
+import ffmpeg
+
+import metrics
+
+# ============================================================
+# ffmpeg / ffprobe 공통 유틸
+# - 모든 단계가 같은 인코딩 설정과 같은 실행 함수를 사용
+# ============================================================
+
+# 최종 인코딩 설정
+X264_PRESET = os.environ.get("VOCI_X264_PRESET", "veryfast")
+X264_CRF = int(os.environ.get("VOCI_X264_CRF", "20"))
+VIDEO_ENCODE_ARGS = {"vcodec": "libx264", "preset": X264_PRESET, "crf": X264_CRF, "pix_fmt": "yuv420p"}
+AUDIO_ENCODE_ARGS = {"acodec": "aac", "audio_bitrate": "160k", "ar": 48000, "ac": 2}
+MUX_ARGS = {"movflags": "+faststart"}
+
+# 필터 그래프 안에서 오디오를 맞출 때 사용하는 형식
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_LAYOUT = "stereo"
+
+
+class MediaError(RuntimeError):
+    pass
+
+
+class MediaInfo:
+    def __init__(self, probe_result):
+        self.raw = probe_result
+        streams = probe_result.get("streams", [])
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        if video is None:
+            raise MediaError("영상 스트림이 없는 파일입니다.")
+        self.video = video
+        self.audio = audio
+        self.width = int(video["width"])
+        self.height = int(video["height"])
+        self.video_codec = video.get("codec_name")
+        self.pix_fmt = video.get("pix_fmt")
+        self.fps = _parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")) or Fraction(30)
+        self.has_audio = audio is not None
+        duration = probe_result.get("format", {}).get("duration") or video.get("duration") or 0
+        self.duration = float(duration)
+
+
+def _parse_rate(value):
+    if not value or value in ("0/0", "0"):
+        return None
+    try:
+        rate = Fraction(value)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def probe(path, **kwargs):
+    args = ["ffprobe", "-show_format", "-show_streams", "-of", "json"]
+    for key, value in kwargs.items():
+        args += [f"-{key}"] if value is None else [f"-{key}", str(value)]
+    returncode, stdout, stderr = _spawn(args + [path])
+    if returncode != 0:
+        raise MediaError(f"ffprobe 실패: {path}\n{_tail(stderr)}")
+    return json.loads(stdout.decode("utf-8"))
+
+
+def media_info(path):
+    return MediaInfo(probe(path))
+
+
+def keyframe_times(path):
+    """영상 스트림의 키프레임 시각(초) 목록. 디코딩 없이 패킷 플래그만 읽음"""
+    args = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path]
+    returncode, stdout, stderr = _spawn(args)
+    if returncode != 0:
+        raise MediaError(f"ffprobe 실패: {path}\n{_tail(stderr)}")
+    times = []
+    for line in stdout.decode("ascii", "replace").splitlines():
+        pts, _, flags = line.partition(",")
+        if flags.startswith("K") and pts not in ("", "N/A"):
+            times.append(float(pts))
+    return sorted(times)
+
+
+def check_decode(path, windows=None):
+    """영상 스트림을 엄격하게 디코딩해 오류가 없는지 확인. 오류가 하나라도 있으면 MediaError
+
+    windows: [(시작 초, 길이 초)] 를 주면 그 구간만 디코딩 (이어 붙인 경계만 확인할 때)
+    """
+    inputs = [ffmpeg.input(path, ss=start, t=length, err_detect="explode") for start, length in windows or ()]
+    outputs = [ffmpeg.output(inp.video, "-", f="null")
+               for inp in inputs or [ffmpeg.input(path, err_detect="explode")]]
+    returncode, _, stderr = _spawn(compile_args(ffmpeg.merge_outputs(*outputs)))
+    # 디코더가 숨기고 넘어가는 오류도 실패로 봄
+    if returncode != 0 or stderr.strip():
+        raise MediaError(f"디코딩 검사 실패: {path}\n{_tail(stderr)}")
+
+
+def silence(duration):
+    return ffmpeg.input(f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl={AUDIO_LAYOUT}", f="lavfi", t=duration).audio
+
+
+def normalize_audio(a):
+    return a.filter("aresample", AUDIO_SAMPLE_RATE).filter("aformat", sample_fmts="fltp", channel_layouts=AUDIO_LAYOUT)
+
+
+def encode_audio_segments(input_path, segments, has_audio, out_path):
+    """segments 의 오디오만 이어 붙여 AAC 로 인코딩 (오디오가 없으면 같은 길이의 무음)"""
+    if has_audio:
+        parts = [
+            normalize_audio(ffmpeg.input(input_path, ss=s, t=e - s).audio).filter("asetpts", "PTS-STARTPTS")
+            for s, e in segments
+        ]
+        a = parts[0] if len(parts) == 1 else ffmpeg.concat(*parts, v=0, a=1)
+    else:
+        a = silence(sum(e - s for s, e in segments))
+    run(ffmpeg.output(a, out_path, **AUDIO_ENCODE_ARGS))
+
+
+def write_concat_files(path, files, durations=None):
+    """concat demuxer 용 파일 목록 작성
+
+    durations: 파일마다 길이(초). 주면 다음 파일의 시작 시각을 파일에서 읽은 길이 대신 이 값으로 정함
+    (마지막 프레임 길이가 빠진 길이로 읽히면 다음 파일의 첫 프레임이 한 프레임 겹침)
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i, name in enumerate(files):
+            escaped = os.path.abspath(name).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if durations is not None:
+                f.write(f"duration {durations[i]:.6f}\n")
+
+
+def concat_copy(files, durations, audio_path, output_path, workdir, **output_args):
+    """영상 조각 files 를 재인코딩 없이 이어 붙이고 audio_path 의 오디오와 합쳐 output_path 로 저장
+
+    durations: 조각마다 길이(초). 조각 경계 시각을 이 값으로 맞춤 (write_concat_files)
+    output_args: 추가 출력 옵션 (예: 영상 태그)
+    """
+    list_path = os.path.join(workdir, f"concat-{uuid.uuid4().hex}.txt")
+    write_concat_files(list_path, files, durations)
+    try:
+        video = ffmpeg.input(list_path, f="concat", safe=0).video
+        audio = ffmpeg.input(audio_path).audio
+        run(ffmpeg.output(video, audio, output_path, c="copy", **output_args, **MUX_ARGS))
+    finally:
+        os.remove(list_path)
+
+
+def _tail(stderr, lines=20):
+    if not stderr:
+        return ""
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode("utf-8", "replace")
+    return "\n".join(stderr.strip().splitlines()[-lines:])
+
+
+def compile_args(stream):
+    """ffmpeg-python 스트림을 실행 인자 목록으로 변환 (이미 목록이면 그대로)"""
+    if isinstance(stream, (list, tuple)):
+        return list(stream)
+    return stream.global_args("-hide_banner", "-nostdin", "-loglevel", "error").overwrite_output().compile()
+
+
+# 현재 스레드에서 실행되는 ffmpeg 의 진행률(0~1)을 받을 콜백
+_progress = threading.local()
+
+
+@contextmanager
+def reporting(callback):
+    previous = getattr(_progress, "callback", None)
+    _progress.callback = callback
+    try:
+        yield
+    finally:
+        _progress.callback = previous
+
+
+def report(fraction):
+    """현재 스레드의 reporting() 콜백에 진행률 전달 (없으면 무시)"""
+    callback = getattr(_progress, "callback", None)
+    if callback is not None:
+        callback(fraction)
+
+
+def _spawn(args, on_line=None):
+    """args 를 실행해 (returncode, stdout, stderr) 를 반환. on_line 을 주면 stdout 을 줄마다 전달
+
+    프로세스 사용량(CPU, 메모리, 입출력)은 현재 계측 단계(metrics.stage)에 기록됨
+    """
+    started = time.perf_counter()
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr 를 따로 비워 주지 않으면 파이프가 차서 멈출 수 있음
+    chunks = []
+    drain = threading.Thread(target=lambda: chunks.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    lines = []
+    for line in proc.stdout:
+        if on_line is None:
+            lines.append(line)
+        else:
+            on_line(line)
+    returncode = metrics.wait(proc, started)
+    drain.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    return returncode, b"".join(lines), b"".join(chunks)
+
+
+def iter_output(stream, block_size, buffer=None, pass_fds=()):
+    """ffmpeg 를 실행해 stdout 을 block_size 바이트씩 읽어 돌려줌 (마지막 블록은 더 짧을 수 있음)
+
+    무압축 프레임을 파이썬에서 분석할 때 사용. 버퍼 하나를 재사용하므로 받은 블록은 다음 블록을 읽기 전에 다 써야 함
+    buffer(쓰기 가능한 연속 버퍼, 예: 미리 할당한 NumPy 배열)를 주면 그 버퍼에 바로 읽어 들임
+    pass_fds: ffmpeg 에 같은 번호로 넘길 파일 디스크립터 (예: 필터가 /dev/fd/N 에 쓰는 파이프). 실행 직후 이쪽 사본은 닫음
+    중간에 그만 읽으면(제너레이터를 닫으면) 프로세스를 종료. 실패하면 MediaError
+    """
+    view = memoryview(bytearray(block_size)) if buffer is None else memoryview(buffer).cast("B")[:block_size]
+    try:
+        args = compile_args(stream)
+        started = time.perf_counter()
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=pass_fds)
+    finally:
+        # 쓰는 쪽은 ffmpeg 만 갖도록 (ffmpeg 가 끝나면 읽는 쪽이 EOF 를 받음)
+        for fd in pass_fds:
+            os.close(fd)
+    chunks = []
+    drain = threading.Thread(target=lambda: chunks.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    finished = False
+    try:
+        while True:
+            filled = 0
+            while filled < block_size:
+                n = proc.stdout.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            if filled:
+                yield view[:filled]
+            if filled < block_size:
+                break
+        finished = True
+    finally:
+        if not finished:
+            proc.kill()
+        returncode = metrics.wait(proc, started)
+        drain.join()
+        proc.stdout.close()
+        proc.stderr.close()
+    if returncode != 0:
+        raise MediaError(f"ffmpeg 실패 (code {returncode})\n{_tail(b''.join(chunks))}")
+
+
+def run(stream, duration=None):
+    """ffmpeg 실행. 실패하면 stderr 마지막 부분을 담아 MediaError
+
+    duration(출력 길이, 초)을 주면 -progress 출력으로 reporting() 콜백에 진행률을 전달
+    """
+    args = compile_args(stream)
+    callback = getattr(_progress, "callback", None)
+    on_line = None
+    if callback is not None and duration:
+        args = args[:1] + ["-progress", "pipe:1", "-nostats"] + args[1:]
+
+        def on_line(line):
+            key, _, value = line.decode("ascii", "replace").strip().partition("=")
+            if key == "out_time_us" and value.isdigit():
+                callback(min(1.0, int(value) / 1e6 / duration))
+
+    returncode, _, stderr = _spawn(args, on_line)
+    if returncode != 0:
+        raise MediaError(f"ffmpeg 실패 (code {returncode})\n{_tail(stderr)}")
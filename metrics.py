@@ -0,0 +1,411 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================
+# 처리 성능 계측
+# - 단계(stage)마다 경과 시간, CPU 시간, 최대 메모리(RSS), 읽기/쓰기 바이트를 기록
+#   CPU/읽기·쓰기는 스레드별 값으로 잼: 단계를 실행한 스레드 + wrap() 으로 감싼 작업자 스레드
+#   (작업 여러 개가 동시에 실행돼도 다른 작업의 사용량이 섞이지 않음. 회수한 하위 프로세스 입출력도 섞이지 않음)
+#   모델 추론(torch/ONNX Runtime)의 내부 스레드 풀 사용량은 native_work() 블록 동안 파이썬이 만들지 않은
+#   스레드의 CPU 증가분으로 기록. 다른 작업의 추론과 겹치면 나눌 수 없으므로 native_cpu_shared 로 표시하고
+#   누적 지표(Prometheus)에서는 뺌
+#   최대 메모리는 단계 실행 중 RSS_SAMPLE_SECONDS 간격으로 잰 프로세스 전체 RSS 의 최댓값 (동시 작업과 공유)
+# - 단계 안에서 실행된 ffmpeg/ffprobe 프로세스는 종료 시 rusage 와 /proc/<pid>/io 로 따로 기록
+# - 작업(job)마다 JSON 보고서로 저장하고, 누적값은 Prometheus 텍스트 형식으로 노출
+# ============================================================
+
+# 설정하면 이 포트에서 /metrics 를 제공
+METRICS_PORT = int(os.environ.get("VOCI_METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("VOCI_METRICS_HOST", "0.0.0.0")
+
+RSS_SAMPLE_SECONDS = float(os.environ.get("VOCI_RSS_SAMPLE_SECONDS", "0.05"))
+
+# ru_maxrss 단위: Linux 는 KiB, macOS 는 바이트
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _read_io(path):
+    """/proc/.../io 의 (rchar, wchar). 읽을 수 없는 플랫폼이면 (0, 0)"""
+    try:
+        with open(path) as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return 0, 0
+    return int(fields.get("rchar", 0)), int(fields.get("wchar", 0))
+
+
+def _thread_usage():
+    """현재 스레드의 (CPU 초, 읽기 바이트, 쓰기 바이트). 스레드 입출력에는 회수한 하위 프로세스 몫이 들어가지 않음"""
+    return (time.thread_time(), *_read_io("/proc/thread-self/io"))
+
+
+def _native_cpu():
+    """파이썬이 만들지 않은 스레드(torch/ONNX Runtime 스레드 풀 등)의 CPU 시간 합계 (초). /proc 이 없으면 0"""
+    python_threads = {thread.native_id for thread in threading.enumerate()}
+    total = 0
+    try:
+        tids = os.listdir("/proc/self/task")
+    except OSError:
+        return 0.0
+    for tid in tids:
+        if int(tid) in python_threads:
+            continue
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as f:
+                # 스레드 이름에 공백이 있을 수 있으므로 ')' 뒤에서부터 셈 (utime, stime 은 12, 13 번째)
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        total += int(fields[11]) + int(fields[12])
+    return total / _CLOCK_TICKS
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def _current_rss():
+    """현재 RSS. /proc 이 없는 플랫폼이면 프로세스 전체 최대 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return _peak_rss()
+
+
+class _RssSampler:
+    """블록 실행 중 현재 RSS 를 주기적으로 재서 최댓값을 기록"""
+
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="voci-rss", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+        return self.peak
+
+
+class Span:
+    """한 단계의 계측값. 실행 중 만들어진 하위 프로세스 기록을 함께 가짐"""
+
+    def __init__(self, name, labels=None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.processes = []
+        self.wall_seconds = 0.0
+        self.python_cpu_seconds = 0.0
+        self.python_read_bytes = 0
+        self.python_write_bytes = 0
+        self.python_peak_rss_bytes = 0
+        self.native_cpu_seconds = 0.0
+        self.native_cpu_shared = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add_process(self, record):
+        with self._lock:
+            self.processes.append(record)
+
+    def add_thread_usage(self, cpu_seconds, read_bytes, write_bytes):
+        with self._lock:
+            self.python_cpu_seconds += cpu_seconds
+            self.python_read_bytes += read_bytes
+            self.python_write_bytes += write_bytes
+
+    def add_native_cpu(self, seconds, shared):
+        with self._lock:
+            self.native_cpu_seconds += seconds
+            self.native_cpu_shared = self.native_cpu_shared or shared
+
+    def to_dict(self):
+        with self._lock:
+            processes = list(self.processes)
+        subprocess_cpu = sum(p["user_seconds"] + p["system_seconds"] for p in processes)
+        subprocess_rss = max((p["peak_rss_bytes"] for p in processes), default=0)
+        return {
+            "stage": self.name,
+            **self.labels,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.python_cpu_seconds + self.native_cpu_seconds + subprocess_cpu, 6),
+            "python_cpu_seconds": round(self.python_cpu_seconds, 6),
+            "native_cpu_seconds": round(self.native_cpu_seconds, 6),
+            "native_cpu_shared": self.native_cpu_shared,
+            "subprocess_cpu_seconds": round(subprocess_cpu, 6),
+            "peak_rss_bytes": max(self.python_peak_rss_bytes, subprocess_rss),
+            "python_peak_rss_bytes": self.python_peak_rss_bytes,
+            "subprocess_peak_rss_bytes": subprocess_rss,
+            "read_bytes": self.python_read_bytes + sum(p["read_bytes"] for p in processes),
+            "write_bytes": self.python_write_bytes + sum(p["write_bytes"] for p in processes),
+            "error": self.error,
+            "processes": processes,
+        }
+
+
+class JobMetrics:
+    """작업 하나에서 실행된 단계들의 계측값 모음"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            stages = [span.to_dict() for span in self.spans]
+        totals = {
+            key: sum(s[key] for s in stages)
+            for key in ("wall_seconds", "cpu_seconds", "read_bytes", "write_bytes")
+        }
+        totals["peak_rss_bytes"] = max((s["peak_rss_bytes"] for s in stages), default=0)
+        totals["processes"] = sum(len(s["processes"]) for s in stages)
+        return {"job_id": self.job_id, "started_at": self.started_at, "totals": totals, "stages": stages}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+# 현재 스레드에서 기록 중인 작업/단계
+_current = threading.local()
+
+
+def current_span():
+    return getattr(_current, "span", None)
+
+
+@contextmanager
+def job(job_id):
+    """이 블록 안의 stage() 기록을 모으는 JobMetrics 를 돌려줌"""
+    previous = getattr(_current, "job", None)
+    _current.job = JobMetrics(job_id)
+    try:
+        yield _current.job
+    finally:
+        _current.job = previous
+
+
+@contextmanager
+def stage(name, **labels):
+    """블록 실행을 한 단계로 계측. 작업 보고서와 누적 지표에 모두 반영"""
+    span = Span(name, labels)
+    previous = current_span()
+    _current.span = span
+    sampler = _RssSampler()
+    usage0, wall0 = _thread_usage(), time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = e.__class__.__name__
+        raise
+    finally:
+        span.wall_seconds = time.perf_counter() - wall0
+        span.add_thread_usage(*(b - a for a, b in zip(usage0, _thread_usage())))
+        span.python_peak_rss_bytes = sampler.stop()
+        _current.span = previous
+        recorder = getattr(_current, "job", None)
+        if recorder is not None:
+            recorder.add(span)
+        registry.observe(span)
+
+
+def wrap(fn):
+    """다른 스레드(ThreadPoolExecutor 등)에서 실행해도 호출한 스레드의 단계에 기록되도록 감쌈"""
+    span = current_span()
+
+    def run(*args, **kwargs):
+        previous = current_span()
+        _current.span = span
+        usage0 = _thread_usage()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if span is not None:
+                span.add_thread_usage(*(b - a for a, b in zip(usage0, _thread_usage())))
+            _current.span = previous
+
+    return run
+
+
+# 실행 중인 native_work() 블록 수 (겹친 블록이 있었는지 판단)
+_native_active = 0
+_native_overlaps = 0
+_native_lock = threading.Lock()
+
+
+@contextmanager
+def native_work():
+    """모델 추론처럼 파이썬 밖의 스레드 풀에서 도는 일을 현재 단계에 기록
+
+    블록 동안 파이썬이 만들지 않은 스레드의 CPU 증가분을 더함. 다른 블록과 겹치면 그쪽 몫도 섞이므로 shared 로 표시
+    """
+    global _native_active, _native_overlaps
+    span = current_span()
+    if span is None:
+        yield
+        return
+    with _native_lock:
+        overlapped = _native_active > 0
+        _native_active += 1
+        overlaps0 = _native_overlaps
+        if overlapped:
+            _native_overlaps += 1
+    cpu0 = _native_cpu()
+    try:
+        yield
+    finally:
+        cpu = _native_cpu() - cpu0
+        with _native_lock:
+            _native_active -= 1
+            # 이 블록이 시작한 뒤 다른 블록이 겹쳐 시작했으면 그 블록의 사용량도 섞임
+            shared = overlapped or _native_overlaps != overlaps0
+        span.add_native_cpu(cpu, shared)
+
+
+def wait(proc, started):
+    """proc 종료를 기다려 returncode 를 반환하고, 현재 단계에 프로세스 사용량을 기록
+
+    started: 프로세스를 띄우기 직전의 time.perf_counter()
+    """
+    span = current_span()
+    if span is None or not hasattr(os, "wait4"):
+        return proc.wait()
+    # 좀비 상태로 남겨 둔 채 /proc/<pid>/io 를 읽은 뒤 회수
+    os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+    read_bytes, write_bytes = _read_io(f"/proc/{proc.pid}/io")
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    span.add_process({
+        "tool": os.path.basename(str(proc.args[0])) if isinstance(proc.args, (list, tuple)) else str(proc.args),
+        "wall_seconds": round(time.perf_counter() - started, 6),
+        "user_seconds": round(usage.ru_utime, 6),
+        "system_seconds": round(usage.ru_stime, 6),
+        "peak_rss_bytes": usage.ru_maxrss * _RSS_UNIT,
+        "read_bytes": read_bytes,
+        "write_bytes": write_bytes,
+        "returncode": proc.returncode,
+    })
+    return proc.returncode
+
+
+# ============================================================
+# 누적 지표 (Prometheus 텍스트 형식)
+# ============================================================
+_METRICS = (
+    ("voci_stage_runs_total", "counter", "실행된 단계 수"),
+    ("voci_stage_errors_total", "counter", "실패한 단계 수"),
+    ("voci_stage_wall_seconds_total", "counter", "단계 경과 시간 합계"),
+    ("voci_stage_cpu_seconds_total", "counter", "단계 CPU 시간 합계 (하위 프로세스 포함, 다른 작업과 겹친 추론 스레드 풀 제외)"),
+    ("voci_stage_read_bytes_total", "counter", "단계 읽기 바이트 합계 (하위 프로세스 포함)"),
+    ("voci_stage_write_bytes_total", "counter", "단계 쓰기 바이트 합계 (하위 프로세스 포함)"),
+    ("voci_stage_peak_rss_bytes", "gauge", "단계 실행 중 관측된 최대 RSS"),
+    ("voci_subprocess_runs_total", "counter", "실행된 하위 프로세스 수"),
+    ("voci_subprocess_cpu_seconds_total", "counter", "하위 프로세스 CPU 시간 합계"),
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        data = span.to_dict()
+        stage_labels = (("stage", span.name),)
+        with self._lock:
+            self._add("voci_stage_runs_total", stage_labels, 1)
+            self._add("voci_stage_errors_total", stage_labels, 1 if span.error else 0)
+            self._add("voci_stage_wall_seconds_total", stage_labels, data["wall_seconds"])
+            # 다른 작업의 추론과 겹친 스레드 풀 CPU 는 중복으로 더해질 수 있으므로 누적값에서 뺌
+            cpu = data["cpu_seconds"] - (data["native_cpu_seconds"] if data["native_cpu_shared"] else 0)
+            self._add("voci_stage_cpu_seconds_total", stage_labels, cpu)
+            self._add("voci_stage_read_bytes_total", stage_labels, data["read_bytes"])
+            self._add("voci_stage_write_bytes_total", stage_labels, data["write_bytes"])
+            key = ("voci_stage_peak_rss_bytes", stage_labels)
+            self._values[key] = max(self._values.get(key, 0), data["peak_rss_bytes"])
+            for process in data["processes"]:
+                labels = stage_labels + (("tool", process["tool"]),)
+                self._add("voci_subprocess_runs_total", labels, 1)
+                self._add("voci_subprocess_cpu_seconds_total", labels,
+                          process["user_seconds"] + process["system_seconds"])
+
+    def _add(self, name, labels, amount):
+        self._values[(name, labels)] = self._values.get((name, labels), 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = []
+        for name, kind, help_text in _METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(values.items()):
+                if metric != name:
+                    continue
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """port 가 설정되어 있으면 /metrics 서버를 한 번만 띄움 (Streamlit 재실행마다 호출해도 안전)"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="voci-metrics", daemon=True).start()
+        return _server
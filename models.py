@@ -0,0 +1,42 @@
+import threading
+
+# ============================================================
+# 모델 레지스트리
+# - 음성 인식/번역 같은 모델을 프로세스당 한 번만 불러와 모든 작업이 공유
+# - 같은 모델을 여러 스레드가 동시에 요청해도 불러오기는 한 번만 실행
+# ============================================================
+
+_models = {}
+_loading = {}
+_guard = threading.Lock()
+
+
+def get_model(name, loader):
+    """name 으로 등록된 모델을 반환. 처음 요청될 때만 loader() 로 불러옴"""
+    with _guard:
+        if name in _models:
+            return _models[name]
+        lock = _loading.setdefault(name, threading.Lock())
+    with lock:
+        with _guard:
+            if name in _models:
+                return _models[name]
+        model = loader()
+        with _guard:
+            _models[name] = model
+            _loading.pop(name, None)
+        return model
+
+
+def loaded():
+    with _guard:
+        return sorted(_models)
+
+
+def unload(name=None):
+    """name 모델(없으면 전부)을 레지스트리에서 제거해 메모리를 돌려줌"""
+    with _guard:
+        if name is None:
+            _models.clear()
+        else:
+            _models.pop(name, None)
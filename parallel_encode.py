@@ -0,0 +1,112 @@
+import bisect
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import ffmpeg
+
+import checkpoint
+import media
+import metrics
+from analysis_index import content_digest
+
+# ============================================================
+# 병렬 구간 인코딩 (split → encode → concat)
+# - 타임라인을 키프레임 경계에서 SEGMENT_SECONDS 안팎의 조각으로 나눔
+# - 조각마다 ffmpeg 프로세스를 하나씩 띄워 동시에 인코딩 (프로세스당 스레드 수 제한)
+# - 영상 조각은 concat demuxer 로 재인코딩 없이 이어 붙이고, 오디오는 한 번에 인코딩해 합침
+# ============================================================
+
+ENABLED = os.environ.get("VOCI_PARALLEL_ENCODE", "0") == "1"
+THREADS_PER_WORKER = int(os.environ.get("VOCI_ENCODE_THREADS", "4"))
+WORKERS = int(os.environ.get("VOCI_ENCODE_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+SEGMENT_SECONDS = float(os.environ.get("VOCI_SEGMENT_SECONDS", "30"))
+# 이보다 짧은 조각은 만들지 않음 (프로세스 시작 비용 대비 이득이 없음)
+MIN_PIECE_SECONDS = 2.0
+# 조각 인코딩 방식이 바뀌면 올림 (중단된 이전 실행의 조각을 재사용하지 않도록)
+PIECE_VERSION = 2
+
+
+def split_bounds(start, end, keyframes, segment_seconds=SEGMENT_SECONDS):
+    """[start, end) 를 segment_seconds 간격 근처의 키프레임에서 나눈 경계 목록 (start, ..., end)"""
+    bounds = [start]
+    while end - bounds[-1] > segment_seconds + MIN_PIECE_SECONDS:
+        target = bounds[-1] + segment_seconds
+        lo, hi = bounds[-1] + MIN_PIECE_SECONDS, end - MIN_PIECE_SECONDS
+        cut = target
+        # 목표 시각에서 조각 길이의 절반 안쪽에 있는 가장 가까운 키프레임으로 맞춤 (입력 탐색이 정확하고 빠름)
+        i = bisect.bisect_left(keyframes, target)
+        nearby = [k for k in keyframes[max(i - 1, 0):i + 1] if lo <= k <= hi and abs(k - target) <= segment_seconds / 2]
+        if nearby:
+            cut = min(nearby, key=lambda k: abs(k - target))
+        bounds.append(cut)
+    bounds.append(end)
+    return bounds
+
+
+def plan_pieces(segments, keyframes, segment_seconds=SEGMENT_SECONDS):
+    """원본 기준 구간들을 [(원본 시작, 원본 끝, 출력 시작 시각), ...] 조각으로 나눔"""
+    pieces, offset = [], 0.0
+    for start, end in segments:
+        bounds = split_bounds(start, end, keyframes, segment_seconds)
+        for s, e in zip(bounds[:-1], bounds[1:]):
+            pieces.append((s, e, offset + s - start))
+        offset += end - start
+    return pieces
+
+
+def _encode_piece(input_path, piece, video_filters, threads, out_path):
+    start, end, out_offset = piece
+    inp = ffmpeg.input(input_path, ss=start, t=end - start)
+    # 자막 같은 시각 의존 필터가 출력 타임라인 기준으로 동작하도록 시작 시각을 맞춘 뒤 되돌림
+    v = inp.video.filter("setpts", f"PTS-STARTPTS+{out_offset}/TB")
+    for name, args, kwargs in video_filters:
+        v = v.filter(name, *args, **kwargs)
+    v = v.filter("setpts", "PTS-STARTPTS")
+    # setpts 뒤에는 프레임 레이트가 정해지지 않아 mp4 출력이 기본값(25fps)으로 프레임을 복제/삭제하므로 원본 시각 그대로 씀
+    media.run(ffmpeg.output(v, out_path, threads=threads, fps_mode="passthrough", **media.VIDEO_ENCODE_ARGS))
+
+
+def render_chunks(chunks, renders, workers=None):
+    """renders({조각 이름: render(임시 경로)})를 작업자 스레드에서 동시에 실행해 chunks(checkpoint.Chunks)에 채움
+
+    이미 완료된 조각은 건너뜀. 하나라도 실패하면 남은 조각을 취소하고 예외를 그대로 올림. 진행률은 media.report
+    """
+    with ThreadPoolExecutor(max_workers=workers or WORKERS) as pool:
+        # 작업자 스레드의 ffmpeg 사용량도 호출한 단계에 기록
+        futures = [pool.submit(chunks.run, name, metrics.wrap(render)) for name, render in renders.items()]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                media.report(done / len(futures))
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def encode(input_path, output_path, segments, video_filters, workdir, has_audio=True,
+           keyframes=None, workers=None, threads=None, segment_seconds=None):
+    """segments(원본 기준 구간)를 이어 붙이며 video_filters 를 적용해 병렬로 인코딩
+
+    video_filters: [(필터 이름, 위치 인자, 키워드 인자)] - 출력 타임라인 기준으로 적용
+    """
+    workers = workers or WORKERS
+    threads = threads or THREADS_PER_WORKER
+    segment_seconds = segment_seconds or SEGMENT_SECONDS
+    if keyframes is None:
+        keyframes = media.keyframe_times(input_path)
+    pieces = plan_pieces(segments, keyframes, segment_seconds)
+
+    # 입력과 설정이 같으면 중단된 이전 실행에서 완료된 조각을 재사용
+    # (입력은 내용 해시로 구분. 작업/캐시 조회마다 수정 시각이 바뀌므로 수정 시각은 쓰지 않음)
+    identity = ["parallel_encode", PIECE_VERSION, content_digest(input_path), segments, video_filters, has_audio,
+                pieces, media.VIDEO_ENCODE_ARGS, media.AUDIO_ENCODE_ARGS]
+    with checkpoint.Chunks(identity) as chunks:
+        names = [f"{i:05d}.mp4" for i in range(len(pieces))]
+        renders = {"audio.m4a": partial(media.encode_audio_segments, input_path, segments, has_audio)}
+        renders.update((name, partial(_encode_piece, input_path, piece, video_filters, threads))
+                       for piece, name in zip(pieces, names))
+        render_chunks(chunks, renders, workers)
+        media.concat_copy([chunks.path(name) for name in names], [end - start for start, end, _ in pieces],
+                          chunks.path("audio.m4a"), output_path, workdir)
+    return output_path
@@ -0,0 +1,141 @@
+import os
+
+import checkpoint
+import media
+import metrics
+import planner
+import relevance
+import transcript
+import translate
+from planner import Stage
+from stage_cache import get_stage_cache
+from stages import (
+    STAGE_VERSIONS,
+    build_cut_step,
+    build_subtitle_step,
+    build_transition_step,
+    build_translation_step,
+)
+from workspace import get_workspace
+
+# ============================================================
+# 편집 파이프라인 - Streamlit 앱과 CLI 가 함께 사용
+# params (JSON 으로 저장 가능한 dict):
+#   session_id, video {digest, path}, inputs [작업이 끝나면 고정 해제할 경로]
+#   cut {subject, desired_length, mode, remove_silence} / subtitles {font_digest, font_path, style, color, size}
+#   translation {target_language} / transition {digest, path}  - 있는 단계만 실행
+# ============================================================
+
+STAGE_LABELS = {
+    "cut_edit": "컷 편집",
+    "subtitles": "자막 추가",
+    "translation": "번역",
+    "transition": "전환 영상 삽입",
+}
+# 작업별 처리 성능 보고서(JSON)를 저장하는 디렉터리 (workspace 기준)
+REPORTS_DIRNAME = "reports"
+
+
+def report_path(job_id):
+    return os.path.join(get_workspace().root, REPORTS_DIRNAME, f"{job_id}.json")
+
+
+def build_stages(params, workdir):
+    """단계 목록. 단계를 만들 때 하는 분석/모델 작업(음성 인식, 관련도, 번역)은 그 단계 이름의 span 에 기록"""
+    video_path = params["video"]["path"]
+    stages = []
+    if "cut" in params:
+        opts = params["cut"]
+        remove_silence = opts.get("remove_silence", True)
+        with metrics.stage("cut_edit", phase="plan"):
+            cut_step = build_cut_step(video_path, opts["subject"], opts["desired_length"], opts["mode"],
+                                      remove_silence=remove_silence)
+        stages.append(Stage("cut_edit", STAGE_VERSIONS["cut_edit"],
+                            {"subject": opts["subject"], "desired_length": opts["desired_length"],
+                             "mode": opts["mode"], "remove_silence": remove_silence,
+                             "transcript": transcript.settings(),
+                             "relevance": {"model": relevance.MODEL_NAME, "version": relevance.EMBED_VERSION}},
+                            cut_step))
+
+    subtitle_step = None
+    if "subtitles" in params:
+        opts = params["subtitles"]
+        with metrics.stage("subtitles", phase="plan"):
+            subtitle_step = build_subtitle_step(video_path, opts["font_path"], opts["style"], opts["color"],
+                                                opts["size"], workdir)
+        stages.append(Stage("subtitles", STAGE_VERSIONS["subtitles"],
+                            {"font": opts["font_digest"], "style": opts["style"], "color": opts["color"],
+                             "size": opts["size"], "transcript": transcript.settings()},
+                            subtitle_step))
+
+    if "translation" in params:
+        target_language = params["translation"]["target_language"]
+        with metrics.stage("translation", phase="plan"):
+            translation_step = build_translation_step(
+                video_path, target_language,
+                style=subtitle_step.style if subtitle_step else None,
+                font_dir=subtitle_step.font_dir if subtitle_step else None,
+                stacked=subtitle_step is not None,
+            )
+            translation_settings = translate.settings(target_language,
+                                                      transcript.get_transcript(video_path).language)
+        stages.append(Stage("translation", STAGE_VERSIONS["translation"],
+                            {"target_language": target_language, "style": translation_step.style,
+                             "transcript": transcript.settings(), "translation": translation_settings},
+                            translation_step))
+
+    if "transition" in params:
+        opts = params["transition"]
+        stages.append(Stage("transition", STAGE_VERSIONS["transition"], {"transition": opts["digest"]},
+                            build_transition_step(opts["path"])))
+    return stages
+
+
+def run_pipeline(ctx, params):
+    # 실행 중 만들어지는 출력 파일은 작업이 끝날 때까지 퇴출되지 않도록 고정
+    workspace = get_workspace()
+    pinned = []
+
+    def pin(path):
+        workspace.acquire(path)
+        pinned.append(path)
+        return path
+
+    with metrics.job(ctx.job_id) as job_metrics:
+        try:
+            workdir = workspace.session_dir(params["session_id"])
+            ctx.report(0.0, "편집 준비 중...", force=True)
+            stages = build_stages(params, workdir)
+            names = [stage.name for stage in stages]
+            group = {"start": 0, "size": 0}
+
+            def on_group(group_names):
+                group["start"], group["size"] = names.index(group_names[0]), len(group_names)
+                label = " + ".join(STAGE_LABELS[name] for name in group_names)
+                ctx.report(group["start"] / len(names), f"{label} 진행 중...", force=True)
+
+            def on_encode(fraction):
+                ctx.report((group["start"] + fraction * group["size"]) / len(names))
+
+            with media.reporting(on_encode):
+                result_path, _, _ = planner.execute(
+                    stages, params["video"]["path"], params["video"]["digest"], get_stage_cache(), workdir,
+                    pin=pin, on_group=on_group, manifest=checkpoint.manifest_path(ctx.job_id, workspace),
+                )
+            return result_path
+        finally:
+            workspace.release(*pinned)
+            # 제출할 때 고정해 둔 업로드 파일
+            workspace.release(*params["inputs"])
+            job_metrics.save(report_path(ctx.job_id))
+
+
+def resume_pipeline(ctx, params):
+    """서버 재시작으로 중단된 작업을 이어서 실행. 완료된 단계/조각은 캐시와 체크포인트에서 재사용"""
+    workspace = get_workspace()
+    missing = [path for path in params["inputs"] if not os.path.exists(path)]
+    if missing:
+        raise RuntimeError("입력 파일이 정리되어 이어서 실행할 수 없습니다. 다시 업로드해 주세요.")
+    # 제출할 때 잡아 둔 고정은 이전 프로세스와 함께 사라졌으므로 다시 고정 (run_pipeline 이 해제)
+    workspace.acquire(*params["inputs"])
+    return run_pipeline(ctx, params)
@@ -0,0 +1,99 @@
+import collections
+import os
+import time
+
+import checkpoint
+import filtergraph
+import metrics
+from stage_cache import stage_key
+
+# ============================================================
+# 단계 실행 계획
+# - 캐시에 남아 있는 가장 뒤쪽 단계 결과에서 이어서 시작
+# - 남은 단계 중 한 필터 그래프로 합칠 수 있는 단계(filtergraph.joinable)는 묶어 한 번에 인코딩
+# - 묶인 그룹의 결과는 그룹 마지막 단계의 캐시 키로 저장
+# - 그룹이 끝날 때마다 완료된 단계를 작업 매니페스트에 기록 (중단 후 재실행 시 확인용)
+# ============================================================
+
+# name/version/params: 캐시 키, step: filtergraph 단계
+Stage = collections.namedtuple("Stage", "name version params step")
+
+
+def chain_keys(source_digest, stages):
+    keys, digest = [], source_digest
+    for stage in stages:
+        digest = stage_key(digest, stage.name, stage.params, stage.version)
+        keys.append(digest)
+    return keys
+
+
+def plan_groups(stages, start=0):
+    """start 이후 단계들을 [(첫 인덱스, [Stage, ...]), ...] 그룹으로 묶음"""
+    groups = []
+    for i in range(start, len(stages)):
+        stage = stages[i]
+        if groups and filtergraph.joinable([s.step for s in groups[-1][1]], stage.step):
+            groups[-1][1].append(stage)
+        else:
+            groups.append((i, [stage]))
+    return groups
+
+
+def write_manifest(path, source_digest, stages, keys, outputs):
+    """완료된 단계(outputs: 인덱스 → 결과 경로)를 매니페스트에 원자적으로 기록"""
+    checkpoint.write_json_atomic(path, {
+        "source": source_digest,
+        "updated_at": time.time(),
+        "stages": [
+            {"name": stage.name, "key": key, "done": i in outputs, "path": outputs.get(i)}
+            for i, (stage, key) in enumerate(zip(stages, keys))
+        ],
+    })
+
+
+def execute(stages, source_path, source_digest, cache, workdir, pin=None, on_group=None, manifest=None):
+    """단계들을 실행하고 (최종 경로, 최종 키, 캐시에서 재사용한 단계 수) 를 반환
+
+    manifest: 경로를 주면 단계 그룹이 끝날 때마다 진행 상황을 기록
+    """
+    pin = pin or (lambda path: path)
+    if not stages:
+        return source_path, source_digest, 0
+    keys = chain_keys(source_digest, stages)
+    outputs = {}
+
+    start, current = 0, source_path
+    for i in range(len(stages) - 1, -1, -1):
+        path = cache.lookup(keys[i])
+        if path is not None:
+            start, current = i + 1, pin(path)
+            outputs[i] = path
+            break
+    reused = start
+    if manifest is not None:
+        write_manifest(manifest, source_digest, stages, keys, outputs)
+
+    for first, group in plan_groups(stages, start):
+        last = first + len(group) - 1
+        # 그룹 결과는 마지막 단계의 키로 저장되므로, 마지막 단계 기준의 입력 키를 사용
+        input_digest = keys[last - 1] if last > 0 else source_digest
+        prior_steps = [s.step for s in stages[:first]]
+        if on_group is not None:
+            on_group([s.name for s in group])
+        src = current
+        with metrics.stage("+".join(s.name for s in group)) as span:
+            key, path, hit = cache.run(
+                group[-1].name, group[-1].version, input_digest, group[-1].params,
+                lambda out: filtergraph.render_steps(src, [s.step for s in group], out, workdir, prior_steps),
+                reserve_bytes=_size(src),
+            )
+            span.labels["cache_hit"] = hit
+        current = pin(path)
+        outputs[last] = path
+        if manifest is not None:
+            write_manifest(manifest, source_digest, stages, keys, outputs)
+    return current, keys[-1], reused
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
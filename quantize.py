@@ -0,0 +1,74 @@
+import os
+import re
+
+from workspace import get_workspace
+
+# ============================================================
+# CPU 추론 백엔드 (음성 인식/번역 모델)
+# - fp32: transformers 모델 그대로
+# - int8: nn.Linear 가중치를 int8 로 동적 양자화 (torch.ao.quantization.quantize_dynamic)
+#         메모리는 약 1/4, CPU 처리량은 보통 1.5~3배. 정확도 차이는 benchmarks/bench_quantize.py 로 확인
+# - onnx: optimum 으로 ONNX 로 내보내 ONNX Runtime 으로 실행 (optimum[onnxruntime] 가 설치된 경우만)
+#         내보낸 모델은 workspace/onnx 에 저장해 다음 실행부터 재사용
+# 실행 중 선택: VOCI_INFERENCE_BACKEND 또는 함수 인자 (모델 레지스트리 키에 백엔드가 포함되어 함께 띄울 수 있음)
+# ============================================================
+
+BACKENDS = ("fp32", "int8", "onnx")
+BACKEND = os.environ.get("VOCI_INFERENCE_BACKEND", "fp32")
+ONNX_DIRNAME = "onnx"
+
+# 모델 종류 → (transformers 클래스 이름, optimum ONNX Runtime 클래스 이름)
+MODEL_CLASSES = {
+    "speech_seq2seq": ("AutoModelForSpeechSeq2Seq", "ORTModelForSpeechSeq2Seq"),
+    "seq2seq": ("AutoModelForSeq2SeqLM", "ORTModelForSeq2SeqLM"),
+}
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 추론 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    return backend
+
+
+def onnx_dir(model_name, workspace=None):
+    workspace = workspace or get_workspace()
+    return os.path.join(workspace.root, ONNX_DIRNAME, re.sub(r"[^A-Za-z0-9._-]+", "--", model_name))
+
+
+def quantize_dynamic(model):
+    """Linear 층을 int8 동적 양자화한 모델 (활성값은 실행 중 양자화)"""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx(kind, model_name):
+    try:
+        import optimum.onnxruntime as ort
+    except ImportError as e:
+        raise RuntimeError("onnx 백엔드를 쓰려면 optimum[onnxruntime] 를 설치해 주세요.") from e
+    cls = getattr(ort, MODEL_CLASSES[kind][1])
+    path = onnx_dir(model_name)
+    if os.path.exists(os.path.join(path, "config.json")):
+        return cls.from_pretrained(path)
+    model = cls.from_pretrained(model_name, export=True)
+    # 내보내기는 오래 걸리므로 저장해 두고, 저장에 실패해도 이번 실행은 계속
+    try:
+        model.save_pretrained(path)
+    except OSError:
+        pass
+    return model
+
+
+def load_model(kind, model_name, backend=None):
+    """kind("speech_seq2seq" / "seq2seq") 모델을 backend(없으면 BACKEND) 로 불러옴 (추론 모드)"""
+    backend = check_backend(backend or BACKEND)
+    if backend == "onnx":
+        return _load_onnx(kind, model_name)
+    import transformers
+
+    model = getattr(transformers, MODEL_CLASSES[kind][0]).from_pretrained(model_name)
+    model.eval()
+    if backend == "int8":
+        model = quantize_dynamic(model)
+    return model
@@ -0,0 +1,114 @@
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import metrics
+import models
+
+# ============================================================
+# 주제(subject)와 자막 구간의 관련도
+# - transformers 문장 임베딩 모델을 CPU 에서 묶음(batch)으로 실행. 토큰 길이가 비슷한 문장끼리 묶어 패딩 낭비를 줄임
+# - 구간 임베딩은 분석 색인(AnalysisIndex)에 영상별로 저장하므로 주제가 바뀌면
+#   주제 문장 하나만 임베딩하고 저장된 행렬과 내적 한 번으로 점수를 구함
+# - 모델은 models.get_model 로 프로세스당 한 번만 불러옴
+# ============================================================
+
+MODEL_NAME = os.environ.get("VOCI_EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+MAX_LENGTH = 128
+BATCH_SIZE = 64
+# 한 묶음의 (문장 수 × 가장 긴 문장의 토큰 수) 상한
+MAX_BATCH_TOKENS = 8192
+# 임베딩 방식이 바뀌면 올려 색인에 저장된 임베딩을 무효화
+EMBED_VERSION = 1
+# 관련 없는 구간도 길이에 비례해 받는 기본 점수 (관련 구간을 먼저 고르고 남는 예산을 채우도록)
+RELEVANCE_FLOOR = 0.1
+
+
+def _load(model_name):
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    return tokenizer, model
+
+
+def get_encoder(model_name=MODEL_NAME):
+    return models.get_model(f"embed:{model_name}", lambda: _load(model_name))
+
+
+def length_buckets(lengths, batch_size=BATCH_SIZE, max_batch_tokens=MAX_BATCH_TOKENS):
+    """길이 순으로 정렬해 묶은 인덱스 배열 목록 (묶음마다 패딩 후 토큰 수가 max_batch_tokens 이하)"""
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    buckets, current, longest = [], [], 0
+    for i in order:
+        longest_next = max(longest, lengths[i])
+        if current and (len(current) >= batch_size or (len(current) + 1) * longest_next > max_batch_tokens):
+            buckets.append(np.array(current))
+            current, longest_next = [], lengths[i]
+        current.append(i)
+        longest = longest_next
+    if current:
+        buckets.append(np.array(current))
+    return buckets
+
+
+def embed(texts, model_name=MODEL_NAME):
+    """문장 목록 → L2 정규화한 (문장 수, 차원) float32 임베딩 (토큰 평균 풀링)"""
+    import torch
+
+    texts = list(texts)
+    tokenizer, model = get_encoder(model_name)
+    if not texts:
+        return np.empty((0, model.config.hidden_size), dtype=np.float32)
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+    out = np.empty((len(texts), model.config.hidden_size), dtype=np.float32)
+    with torch.inference_mode(), metrics.native_work():
+        for bucket in length_buckets(lengths):
+            encoded = tokenizer([texts[i] for i in bucket], padding=True, truncation=True, max_length=MAX_LENGTH,
+                                return_tensors="pt")
+            hidden = model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            out[bucket] = torch.nn.functional.normalize(pooled, dim=1).numpy()
+    return out
+
+
+@functools.lru_cache(maxsize=256)
+def query_embedding(subject, model_name=MODEL_NAME):
+    vector = embed([subject], model_name)[0]
+    vector.setflags(write=False)
+    return vector
+
+
+def cue_embeddings(index, cues, model_name=MODEL_NAME):
+    """자막 구간 임베딩 (분석 색인에 float16 으로 저장)"""
+    texts = [text for _, _, text in cues]
+    digest = hashlib.sha256(json.dumps(texts, ensure_ascii=False).encode("utf-8")).hexdigest()
+    settings = {"model": model_name, "max_length": MAX_LENGTH, "version": EMBED_VERSION, "texts": digest}
+    vectors = index.load("embeddings", settings, lambda: {"vectors": embed(texts, model_name).astype(np.float16)})
+    return vectors["vectors"]
+
+
+def cue_similarities(index, cues, subject, model_name=MODEL_NAME):
+    """자막 구간마다 주제와의 코사인 유사도"""
+    vectors = cue_embeddings(index, cues, model_name)
+    if not len(vectors):
+        return np.empty(0, dtype=np.float32)
+    return vectors.astype(np.float32) @ query_embedding(subject.strip(), model_name)
+
+
+def interval_scores(intervals, cues, similarities, floor=RELEVANCE_FLOOR):
+    """구간마다 (floor + 겹치는 자막의 유사도를 겹친 시간으로 가중한 밀도) × 길이"""
+    intervals = np.asarray(intervals, dtype=np.float32).reshape(-1, 2)
+    durations = intervals[:, 1] - intervals[:, 0]
+    if not len(cues):
+        return durations * floor
+    cue_times = np.asarray([(start, end) for start, end, _ in cues], dtype=np.float32)
+    overlap = (np.minimum(intervals[:, 1:2], cue_times[None, :, 1])
+               - np.maximum(intervals[:, 0:1], cue_times[None, :, 0]))
+    relevance = np.clip(overlap, 0, None) @ np.clip(np.asarray(similarities, dtype=np.float32), 0, None)
+    return durations * floor + relevance
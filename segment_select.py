@@ -0,0 +1,88 @@
+import collections
+import os
+
+import numpy as np
+
+# ============================================================
+# 원하는 길이(desired_length)에 맞춘 구간 선택
+# - 점수가 매겨진 후보 구간 중, 서로 겹치지 않고 길이 합이 예산 이하이면서 점수 합이 가장 큰 조합을 고름
+#   (가중 구간 스케줄링 + 0/1 배낭 문제, 길이를 RESOLUTION 초 단위로 나눈 동적 계획법)
+# - 후보 하나마다 NumPy 로 용량 축 전체를 한 번에 갱신하므로 후보 수천 개도 1초 안에 끝남
+# - 결과는 항상 원본 시간 순서
+# ============================================================
+
+# 후보 구간 (초, 초, 점수)
+Candidate = collections.namedtuple("Candidate", "start end score")
+
+# 이보다 짧은 후보는 고르지 않음
+MIN_CLIP_SECONDS = float(os.environ.get("VOCI_MIN_CLIP", "1.0"))
+# 후보를 나눌 때 한 조각의 최대 길이 (짧을수록 예산을 정확히 채우지만 후보가 많아짐)
+MAX_CLIP_SECONDS = 15.0
+# 길이 계산 단위 (초)
+RESOLUTION = 0.1
+# 용량 축 최대 칸 수 (예산이 길면 단위를 키워 표 크기를 제한)
+MAX_UNITS = 2000
+# 조각 하나를 더 넣을 때마다 빼는 점수 (같은 점수면 컷 수가 적은 조합을 고름)
+CUT_PENALTY = 0.05
+# 이어지는 구간으로 보는 간격 (초)
+EPS = 1e-3
+
+
+def split_candidates(intervals, boundaries=(), max_length=MAX_CLIP_SECONDS, min_length=MIN_CLIP_SECONDS):
+    """남길 구간을 샷 경계와 최대 길이에서 나눠 후보 [(시작, 끝)] 를 만듦"""
+    boundaries = np.asarray(boundaries, dtype=np.float64)
+    pieces = []
+    for start, end in intervals:
+        inner = boundaries[(boundaries > start + EPS) & (boundaries < end - EPS)]
+        edges = np.concatenate([[start], inner, [end]])
+        for s, e in zip(edges[:-1], edges[1:]):
+            count = max(1, int(np.ceil((e - s) / max_length - 1e-9)))
+            cuts = np.linspace(s, e, count + 1)
+            pieces.extend((float(a), float(b)) for a, b in zip(cuts[:-1], cuts[1:]) if b - a >= min_length)
+    return pieces
+
+
+def select(candidates, budget, min_length=MIN_CLIP_SECONDS, resolution=RESOLUTION, cut_penalty=CUT_PENALTY):
+    """길이 합이 budget 초 이하이고 서로 겹치지 않으면서 점수 합이 최대인 후보를 시간 순으로 반환"""
+    items = sorted((c for c in candidates if c.end - c.start >= min_length and c.score - cut_penalty > 0),
+                   key=lambda c: (c.end, c.start))
+    if not items or budget <= 0:
+        return []
+    unit = max(resolution, budget / MAX_UNITS)
+    capacity = int(np.floor(budget / unit + 1e-9))
+    starts = np.array([c.start for c in items])
+    ends = np.array([c.end for c in items])
+    # 올림으로 무게를 정해 고른 구간의 실제 길이 합이 예산을 넘지 않게 함
+    weights = np.ceil((ends - starts) / unit - 1e-9).astype(np.int64)
+    values = np.array([c.score for c in items], dtype=np.float32) - np.float32(cut_penalty)
+    # previous[i]: i 번째 후보와 겹치지 않는(먼저 끝나는) 후보 수
+    previous = np.searchsorted(ends, starts + EPS, side="right")
+
+    # best[k, c]: 앞의 k 개 후보만으로 길이 c 칸 이하에서 얻는 최대 점수
+    best = np.zeros((len(items) + 1, capacity + 1), dtype=np.float32)
+    for i, (weight, value, prev) in enumerate(zip(weights, values, previous)):
+        best[i + 1] = best[i]
+        if weight <= capacity:
+            np.maximum(best[i + 1, weight:], best[prev, :capacity + 1 - weight] + value, out=best[i + 1, weight:])
+
+    chosen, k, c = [], len(items), capacity
+    while k > 0:
+        i = k - 1
+        if best[k, c] != best[i, c]:
+            chosen.append(items[i])
+            c -= weights[i]
+            k = previous[i]
+        else:
+            k = i
+    return sorted(chosen, key=lambda item: item.start)
+
+
+def merge_adjacent(segments, gap=EPS):
+    """맞닿은 구간을 합쳐 [(시작, 끝)] 으로 (불필요한 컷을 없앰)"""
+    merged = []
+    for start, end in sorted((s, e) for s, e, *_ in segments):
+        if merged and start - merged[-1][1] <= gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
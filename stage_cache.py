@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from workspace import get_workspace
+
+# ============================================================
+# 단계(stage) 결과 캐시
+# - 키: (입력 내용 해시, 단계 이름, 정규화된 파라미터, 단계 버전)
+# - 단계 출력의 해시로 키 자체를 사용하므로, 다음 단계의 키는 앞 단계 키에서 이어짐
+#   → 자막 색상만 바꾸면 컷 편집 결과는 그대로 재사용되고 자막 단계부터 다시 실행
+# - 결과 파일은 workspace/cache 에 저장되어 LRU 퇴출 대상이 됨
+# ============================================================
+
+CACHE_DIRNAME = "cache"
+
+
+def normalize_value(value):
+    if isinstance(value, str):
+        value = value.strip()
+        # 색상 코드(#RRGGBB)는 대소문자 구분 없이 같은 값
+        if value.startswith("#"):
+            value = value.lower()
+        return value
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {str(k): normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def normalize_params(params):
+    return normalize_value(dict(params or {}))
+
+
+def stage_key(input_digest, stage, params, version):
+    payload = json.dumps(
+        {"input": input_digest, "stage": stage, "params": normalize_params(params), "version": version},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.root = os.path.join(workspace.root, CACHE_DIRNAME)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, key, suffix=".mp4"):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def lookup(self, key, suffix=".mp4"):
+        path = self.path_for(key, suffix)
+        if os.path.exists(path):
+            self.workspace.touch(path)
+            return path
+        return None
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def run(self, stage, version, input_digest, params, render, suffix=".mp4", reserve_bytes=0):
+        """캐시에 결과가 없을 때만 render(output_path) 를 실행하고 (key, path, hit) 를 반환"""
+        key = stage_key(input_digest, stage, params, version)
+        path = self.lookup(key, suffix)
+        if path is not None:
+            return key, path, True
+        # 같은 키를 동시에 계산하지 않도록 키별 잠금
+        with self._lock_for(key):
+            path = self.lookup(key, suffix)
+            if path is not None:
+                return key, path, True
+            path = self.path_for(key, suffix)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = os.path.join(os.path.dirname(path), f".{key}.{uuid.uuid4().hex}{suffix}")
+            self.workspace.reserve(reserve_bytes)
+            with self.workspace.pinned(tmp_path):
+                try:
+                    render(tmp_path)
+                    if not os.path.exists(tmp_path):
+                        raise RuntimeError(f"{stage} 단계가 결과 파일을 만들지 않았습니다.")
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            return key, path, False
+
+
+_stage_cache = None
+_stage_cache_lock = threading.Lock()
+
+
+def get_stage_cache():
+    # 키별 잠금이 세션/작업 사이에 공유되도록 프로세스당 하나만 사용
+    global _stage_cache
+    with _stage_cache_lock:
+        if _stage_cache is None:
+            _stage_cache = StageCache(get_workspace())
+        return _stage_cache
@@ -0,0 +1,193 @@
+import os
+import shutil
+import struct
+
+import cutting
+import filtergraph
+import relevance
+import segment_select
+import translate
+from analysis_index import AnalysisIndex
+from filtergraph import CutStep, SubtitleStep, TransitionStep
+from transcript import get_transcript
+
+# ============================================================
+# 편집 단계
+# - build_*_step: 단계를 필터 그래프 단계(step)로 만듦 (앱에서 여러 단계를 한 그래프로 합칠 때 사용)
+# - ai_* / insert_transition_video: 단계 하나만 실행해 output_path 에 저장
+# ============================================================
+
+# 단계 구현이 바뀌면 버전을 올려 이전 캐시 결과를 무효화
+STAGE_VERSIONS = {
+    "cut_edit": 10,
+    "subtitles": 5,
+    "translation": 6,
+    "transition": 2,
+}
+
+
+def _workdir_for(output_path):
+    return os.path.dirname(os.path.abspath(output_path))
+
+
+# ============================================================
+# 컷 편집
+# ============================================================
+def plan_cut_segments(video_path, subject, desired_length, remove_silence=True):
+    # 디코딩이 필요한 분석은 영상마다 한 번만 하고 색인에 저장 (주제/길이만 바꾸면 색인만 읽음)
+    index = AnalysisIndex(video_path)
+    info = index.info
+    # 1차 거르기: 무음 구간을 뺀 나머지가 후보 (모델 없이 빠르게 계산)
+    intervals = index.keep_intervals() if remove_silence else [(0.0, info.duration)]
+    # 샷 중간에서 끊기지 않도록 샷 경계에서 후보를 나눔
+    pieces = segment_select.split_candidates(intervals, index.shots())
+    cues = get_transcript(video_path, index).cues if subject and subject.strip() and pieces else []
+    if cues:
+        # 주제와 관련된 말이 많은 구간일수록 높은 점수 (구간 임베딩은 색인에 저장되어 주제만 바꾸면 내적 한 번)
+        scores = relevance.interval_scores(pieces, cues, relevance.cue_similarities(index, cues, subject))
+    else:
+        # 주제나 자막이 없으면 길이만큼의 점수 → 예산을 최대한 채움
+        scores = [end - start for start, end in pieces]
+    candidates = [segment_select.Candidate(start, end, float(score)) for (start, end), score in zip(pieces, scores)]
+    segments = segment_select.merge_adjacent(segment_select.select(candidates, float(desired_length)))
+    return segments or [(0.0, min(info.duration, float(desired_length)))]
+
+
+def build_cut_step(video_path, subject, desired_length, mode="reencode", snap_tolerance=None, remove_silence=True):
+    segments = plan_cut_segments(video_path, subject, desired_length, remove_silence)
+    if mode == "fast":
+        # 복사 컷은 키프레임에서만 시작할 수 있으므로 구간을 미리 맞춰 둠 (자막 시각 변환도 이 구간 기준)
+        tolerance = cutting.DEFAULT_SNAP_TOLERANCE if snap_tolerance is None else snap_tolerance
+        index = AnalysisIndex(video_path)
+        segments = cutting.snap_segments(segments, index.keyframes(), tolerance, index.info.duration)
+    return CutStep(segments, mode)
+
+
+def ai_cut_edit(video_path, subject, desired_length, output_path="output_cut_edit.mp4", mode="smart",
+                remove_silence=True):
+    """mode: smart(정확한 컷, 경계 GOP 만 재인코딩) / reencode(정확한 컷, 전체 재인코딩)
+    / fast(키프레임 단위 컷, 재인코딩 없음)
+    remove_silence: 무음(저음량) 구간을 먼저 빼고 나머지에서 구간을 고름"""
+    step = build_cut_step(video_path, subject, desired_length, mode, remove_silence=remove_silence)
+    return filtergraph.render_steps(video_path, [step], output_path, _workdir_for(output_path))
+
+
+# ============================================================
+# 자막
+# ============================================================
+# 자막 스타일 프리셋 (ASS 스타일 필드)
+SUBTITLE_STYLES = {
+    "스타일 1": {"BorderStyle": 1, "Outline": 2, "Shadow": 0},                                # 외곽선
+    "스타일 2": {"BorderStyle": 3, "Outline": 8, "Shadow": 0, "OutlineColour": "&H80000000"},  # 반투명 박스
+    "스타일 3": {"BorderStyle": 1, "Outline": 1, "Shadow": 3, "Bold": -1},                     # 굵게 + 그림자
+}
+# 원문 자막과 번역 자막을 함께 넣을 때 번역 자막을 위로 올리는 간격 (글씨 크기 배수)
+STACKED_MARGIN_FACTOR = 2.2
+
+
+def ass_colour(hex_color):
+    """#RRGGBB → ASS 색상 (&H00BBGGRR)"""
+    value = (hex_color or "#FFFFFF").lstrip("#")
+    if len(value) != 6:
+        value = "FFFFFF"
+    r, g, b = value[0:2], value[2:4], value[4:6]
+    return f"&H00{b}{g}{r}".upper()
+
+
+def font_family_name(font_path):
+    """TTF/OTF/TTC 의 name 테이블에서 글꼴 패밀리 이름을 읽음 (libass 가 이 이름으로 글꼴을 찾음)"""
+    try:
+        with open(font_path, "rb") as f:
+            data = f.read()
+        offset = struct.unpack(">I", data[12:16])[0] if data[:4] == b"ttcf" else 0
+        num_tables = struct.unpack(">H", data[offset + 4:offset + 6])[0]
+        for i in range(num_tables):
+            record = offset + 12 + i * 16
+            if data[record:record + 4] != b"name":
+                continue
+            table = struct.unpack(">I", data[record + 8:record + 12])[0]
+            _, count, strings = struct.unpack(">HHH", data[table:table + 6])
+            fallback = None
+            for j in range(count):
+                platform, _, language, name_id, length, start = struct.unpack(
+                    ">HHHHHH", data[table + 6 + j * 12:table + 18 + j * 12]
+                )
+                if name_id != 1:
+                    continue
+                raw = data[table + strings + start:table + strings + start + length]
+                name = raw.decode("utf-16-be", "ignore") if platform in (0, 3) else raw.decode("latin-1")
+                if platform == 3 and language == 0x409:
+                    return name
+                fallback = fallback or name
+            return fallback
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def prepare_font_dir(font_path, workdir):
+    """libass 가 다른 파일을 훑지 않도록 글꼴 하나만 든 디렉터리를 만듦"""
+    name = os.path.basename(font_path)
+    font_dir = os.path.join(workdir, "fonts", os.path.splitext(name)[0])
+    target = os.path.join(font_dir, name)
+    if not os.path.exists(target):
+        os.makedirs(font_dir, exist_ok=True)
+        try:
+            os.link(font_path, target)
+        except OSError:
+            shutil.copyfile(font_path, target)
+    return font_dir
+
+
+def subtitle_style(style_name, color, font_size, font_name=None):
+    style = {"Fontsize": font_size, "PrimaryColour": ass_colour(color)}
+    style.update(SUBTITLE_STYLES.get(style_name, SUBTITLE_STYLES["스타일 1"]))
+    if font_name:
+        style["Fontname"] = font_name
+    return style
+
+
+def build_subtitle_step(video_path, font_path, subtitle_style_name, subtitle_color, font_size, workdir):
+    font_dir, font_name = None, None
+    if font_path is not None:
+        font_dir = prepare_font_dir(font_path, workdir)
+        font_name = font_family_name(font_path)
+    style = subtitle_style(subtitle_style_name, subtitle_color, font_size, font_name)
+    return SubtitleStep(get_transcript(video_path).cues, style, font_dir, name="subtitles")
+
+
+def ai_add_subtitles(video_path, font_path, subtitle_style, subtitle_color, font_size,
+                     output_path="output_subtitles.mp4"):
+    workdir = _workdir_for(output_path)
+    step = build_subtitle_step(video_path, font_path, subtitle_style, subtitle_color, font_size, workdir)
+    return filtergraph.render_steps(video_path, [step], output_path, workdir)
+
+
+# ============================================================
+# 번역 (번역한 자막을 영상에 입힘)
+# ============================================================
+def build_translation_step(video_path, target_language, style=None, font_dir=None, stacked=False):
+    style = dict(style or subtitle_style("스타일 1", "#FFFFFF", 24))
+    if stacked:
+        # 원문 자막 위에 번역 자막을 쌓음
+        style["MarginV"] = int(30 + style["Fontsize"] * STACKED_MARGIN_FACTOR)
+    transcript = get_transcript(video_path)
+    cues = translate.translate_cues(transcript.cues, target_language, transcript.language)
+    return SubtitleStep(cues, style, font_dir, name=f"translation-{target_language}")
+
+
+def ai_translate_video(video_path, target_language, output_path="output_translation.mp4"):
+    step = build_translation_step(video_path, target_language)
+    return filtergraph.render_steps(video_path, [step], output_path, _workdir_for(output_path))
+
+
+# ============================================================
+# 화면 전환 영상
+# ============================================================
+def build_transition_step(transition_path):
+    return TransitionStep(transition_path)
+
+
+def insert_transition_video(video_path, transition_path, output_path="output_transition.mp4"):
+    step = build_transition_step(transition_path)
+    return filtergraph.render_steps(video_path, [step], output_path, _workdir_for(output_path))
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+
+# ============================================================
+# 업로드 파일 저장 유틸
+# - 업로드 전체를 메모리에 다시 올리지 않도록 고정 크기 버퍼로 나눠 씀
+# - 임시 파일에 쓴 뒤 fsync → os.replace 로 원자적으로 교체
+# ============================================================
+
+# 한 번에 읽어 들이는 버퍼 크기 (세션당 추가 메모리 사용량의 상한)
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def copy_stream(src, dst, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """src 를 chunk_size 버퍼 하나로 재사용하며 dst 에 복사하고, 복사한 바이트 수를 반환"""
+    if hasattr(src, "seek"):
+        src.seek(0)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    total = 0
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            break
+        chunk = view[:n]
+        if on_chunk is not None:
+            on_chunk(chunk)
+        dst.write(chunk)
+        total += n
+    return total
+
+
+def _fsync_dir(path):
+    # rename 결과가 디스크에 남도록 디렉터리 엔트리도 fsync (지원하지 않는 OS 는 무시)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def open_temp(dest_dir, prefix=".upload-"):
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=prefix, suffix=".part")
+    return os.fdopen(fd, "wb"), tmp_path
+
+
+def commit_temp(out, tmp_path, dest_path):
+    """open_temp 로 연 파일을 fsync 한 뒤 dest_path 로 원자적으로 교체"""
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+    os.replace(tmp_path, dest_path)
+    _fsync_dir(os.path.dirname(dest_path) or ".")
+    return dest_path
+
+
+def discard_temp(out, tmp_path):
+    out.close()
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+def save_upload(uploaded_file, dest_path, chunk_size=CHUNK_SIZE):
+    """업로드 파일(file-like)을 dest_path 에 청크 단위로 원자적으로 저장"""
+    dest_dir = os.path.dirname(dest_path) or "."
+    out, tmp_path = open_temp(dest_dir)
+    try:
+        copy_stream(uploaded_file, out, chunk_size)
+        return commit_temp(out, tmp_path, dest_path)
+    except BaseException:
+        discard_temp(out, tmp_path)
+        raise
+
+
+# ============================================================
+# 내용 주소 기반 저장소 (content-addressed store)
+# - 저장하면서 sha256 을 계산하고 objects/<앞 2자리>/<digest><확장자> 에 보관
+# - 같은 내용이 이미 있으면 임시 파일만 버리고 기존 파일을 재사용
+# - 파일 이름이 아니라 내용으로 구분하므로 세션끼리 서로 덮어쓰지 않음
+# ============================================================
+
+def normalize_suffix(suffix):
+    suffix = (suffix or "").lower()
+    if not suffix.startswith("."):
+        suffix = "." + suffix if suffix else ""
+    if not suffix[1:].isalnum():
+        return ""
+    return suffix
+
+
+def object_path(store_dir, digest, suffix=""):
+    return os.path.join(store_dir, "objects", digest[:2], digest + normalize_suffix(suffix))
+
+
+def store_upload(uploaded_file, store_dir, suffix="", chunk_size=CHUNK_SIZE):
+    """업로드(file-like)를 내용 해시로 저장하고 (digest, path) 를 반환"""
+    hasher = hashlib.sha256()
+    out, tmp_path = open_temp(os.path.join(store_dir, "tmp"))
+    try:
+        copy_stream(uploaded_file, out, chunk_size, on_chunk=hasher.update)
+        digest = hasher.hexdigest()
+        dest_path = object_path(store_dir, digest, suffix)
+        if os.path.exists(dest_path):
+            discard_temp(out, tmp_path)
+            os.utime(dest_path)
+            return digest, dest_path
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return digest, commit_temp(out, tmp_path, dest_path)
+    except BaseException:
+        discard_temp(out, tmp_path)
+        raise
+
+
+def store_file(path, store_dir, chunk_size=CHUNK_SIZE):
+    """로컬 파일을 저장소에 넣고 (digest, path) 를 반환"""
+    with open(path, "rb") as f:
+        return store_upload(f, store_dir, os.path.splitext(path)[1], chunk_size)
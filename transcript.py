@@ -0,0 +1,93 @@
+import collections
+
+import numpy as np
+
+import asr
+import quantize
+from analysis_index import AnalysisIndex
+
+# ============================================================
+# 영상별 공유 자막 (음성 인식 결과)
+# - 컷 편집(주제 관련도), 자막, 번역 단계가 모두 이 결과 하나를 씀 → 음성 인식은 영상당 한 번
+# - 분석 색인(AnalysisIndex)에 영상 내용 해시 기준으로 저장. 같은 영상을 다시 올리거나 다른 단계에서 써도
+#   색인만 읽고, 동시에 요청되면 색인의 항목별 잠금으로 한 작업만 인식
+# - 구간(문장): 시작/끝, 텍스트, 언어, 신뢰도(토큰 평균 확률) / 단어: 시작/끝, 텍스트, 확률
+# ============================================================
+
+Word = collections.namedtuple("Word", "start end text probability")
+Segment = collections.namedtuple("Segment", "start end text language confidence words")
+
+# 저장 형식이 바뀌면 올려 색인에 저장된 자막을 무효화
+TRANSCRIPT_VERSION = 1
+
+
+class Transcript:
+    def __init__(self, segments):
+        self.segments = list(segments)
+
+    @property
+    def language(self):
+        """말한 시간이 가장 긴 언어 (음성이 없으면 None)"""
+        durations = collections.Counter()
+        for segment in self.segments:
+            if segment.language:
+                durations[segment.language] += segment.end - segment.start
+        return durations.most_common(1)[0][0] if durations else None
+
+    @property
+    def cues(self):
+        """[(시작 초, 끝 초, 텍스트)] - 자막/번역/관련도 계산에 쓰는 형식"""
+        return [(segment.start, segment.end, segment.text) for segment in self.segments]
+
+    @property
+    def words(self):
+        return [word for segment in self.segments for word in segment.words]
+
+    def __len__(self):
+        return len(self.segments)
+
+    def to_arrays(self):
+        words = self.words
+        return {
+            "start": np.array([s.start for s in self.segments], dtype=np.float64),
+            "end": np.array([s.end for s in self.segments], dtype=np.float64),
+            "text": np.array([s.text for s in self.segments], dtype=np.str_),
+            "language": np.array([s.language or "" for s in self.segments], dtype=np.str_),
+            "confidence": np.array([s.confidence for s in self.segments], dtype=np.float32),
+            # 구간마다 단어 수 (단어 배열을 구간별로 나눌 때 사용)
+            "word_count": np.array([len(s.words) for s in self.segments], dtype=np.int32),
+            "word_start": np.array([w.start for w in words], dtype=np.float64),
+            "word_end": np.array([w.end for w in words], dtype=np.float64),
+            "word_text": np.array([w.text for w in words], dtype=np.str_),
+            "word_probability": np.array([w.probability for w in words], dtype=np.float32),
+        }
+
+    @classmethod
+    def from_arrays(cls, data):
+        bounds = np.concatenate([[0], np.cumsum(data["word_count"])]).astype(int)
+        words = [Word(float(s), float(e), str(t), float(p)) for s, e, t, p in
+                 zip(data["word_start"], data["word_end"], data["word_text"], data["word_probability"])]
+        return cls(Segment(float(s), float(e), str(t), str(lang) or None, float(c), words[bounds[i]:bounds[i + 1]])
+                   for i, (s, e, t, lang, c) in enumerate(zip(data["start"], data["end"], data["text"],
+                                                             data["language"], data["confidence"])))
+
+    @classmethod
+    def from_asr(cls, segments):
+        """asr.transcribe 결과 → Transcript"""
+        return cls(Segment(s["start"], s["end"], s["text"], s.get("language"), s.get("confidence", 0.0),
+                           [Word(w["start"], w["end"], w["text"], w.get("probability", 0.0))
+                            for w in s.get("words", [])])
+                   for s in segments)
+
+
+def settings():
+    """저장된 자막을 구분하는 인식 설정"""
+    return {"version": TRANSCRIPT_VERSION, "asr_version": asr.ASR_VERSION, "model": asr.MODEL_NAME,
+            "backend": quantize.BACKEND, "language": asr.LANGUAGE}
+
+
+def get_transcript(video_path, index=None):
+    """영상의 공유 자막. 색인에 없을 때만 음성 인식"""
+    index = index or AnalysisIndex(video_path)
+    return Transcript.from_arrays(index.load(
+        "transcript", settings(), lambda: Transcript.from_asr(asr.transcribe(video_path)).to_arrays()))
@@ -0,0 +1,186 @@
+import os
+
+import metrics
+import models
+import quantize
+import relevance
+from translation_memory import get_translation_memory, normalize
+
+# ============================================================
+# 자막 번역
+# - marian: Helsinki-NLP/opus-mt-<원문>-<번역> (언어 쌍마다 작은 모델, CPU 에서 가장 빠름)
+# - nllb:   NLLB-200 한 모델로 여러 언어 (marian 모델이 없는 언어 쌍은 자동으로 nllb 사용)
+# - google: deep-translator 의 Google 번역 (네트워크 필요)
+# - 오프라인 모델은 models.get_model 로 모델별 한 번만 불러와 상주시키고(fp32 / int8 / onnx, quantize.py),
+#   토큰 길이가 비슷한 줄끼리 묶어(relevance.length_buckets) 패딩 낭비 없이 탐욕(또는 작은 빔) 디코딩
+# - 같은 줄은 한 번만 번역하고, 번역 메모리(translation_memory.py)에 없는 줄만 모델/API 로 보냄
+# ============================================================
+
+BACKENDS = ("marian", "nllb", "google")
+BACKEND = os.environ.get("VOCI_TRANSLATE_BACKEND", "marian")
+MARIAN_MODEL = os.environ.get("VOCI_MARIAN_MODEL", "Helsinki-NLP/opus-mt-{source}-{target}")
+NLLB_MODEL = os.environ.get("VOCI_NLLB_MODEL", "facebook/nllb-200-distilled-600M")
+# 음성 인식에서 언어를 알 수 없을 때의 원문 언어
+SOURCE_LANGUAGE = os.environ.get("VOCI_SOURCE_LANGUAGE", "ko")
+# 1 이면 탐욕 디코딩. 2~4 정도의 작은 빔은 품질이 조금 좋아지고 속도는 그만큼 느려짐
+NUM_BEAMS = int(os.environ.get("VOCI_TRANSLATE_BEAMS", "1"))
+MAX_LENGTH = 256
+BATCH_SIZE = 64
+MAX_BATCH_TOKENS = 4096
+# 번역 길이 상한 = 원문 토큰 수 × MAX_LENGTH_RATIO + MAX_LENGTH_MARGIN (반복 생성으로 오래 걸리는 것을 막음)
+MAX_LENGTH_RATIO = 2.0
+MAX_LENGTH_MARGIN = 10
+# 번역 방식이 바뀌면 올려 번역 메모리에 저장된 결과를 무효화
+TRANSLATE_VERSION = 1
+
+# ISO 639-1 → NLLB(FLORES-200) 언어 코드
+NLLB_CODES = {
+    "ar": "arb_Arab", "de": "deu_Latn", "en": "eng_Latn", "es": "spa_Latn", "fr": "fra_Latn",
+    "hi": "hin_Deva", "id": "ind_Latn", "it": "ita_Latn", "ja": "jpn_Jpan", "ko": "kor_Hang",
+    "pt": "por_Latn", "ru": "rus_Cyrl", "th": "tha_Thai", "tr": "tur_Latn", "vi": "vie_Latn",
+    "zh": "zho_Hans", "zh-cn": "zho_Hans", "zh-tw": "zho_Hant",
+}
+
+# marian 모델이 없는 언어 쌍 (매번 내려받기를 다시 시도하지 않도록)
+_missing_pairs = set()
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 번역 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    return backend
+
+
+def nllb_code(language):
+    code = NLLB_CODES.get(language.lower())
+    if code is None:
+        raise ValueError(f"nllb 번역에서 지원하지 않는 언어 코드: {language}")
+    return code
+
+
+def _load_tokenizer(model_name, **kwargs):
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name, **kwargs)
+
+
+def _load_marian(model_name, inference_backend):
+    return _load_tokenizer(model_name), quantize.load_model("seq2seq", model_name, inference_backend)
+
+
+def get_marian(source, target, inference_backend=None):
+    """(tokenizer, model). 해당 언어 쌍 모델이 없으면 OSError"""
+    inference_backend = quantize.check_backend(inference_backend or quantize.BACKEND)
+    model_name = MARIAN_MODEL.format(source=source, target=target)
+    return models.get_model(f"translate:{model_name}:{inference_backend}",
+                            lambda: _load_marian(model_name, inference_backend))
+
+
+def get_nllb(source, inference_backend=None):
+    """(tokenizer, model). 모델은 모든 언어가 공유하고 토크나이저만 원문 언어별로 둠"""
+    inference_backend = quantize.check_backend(inference_backend or quantize.BACKEND)
+    tokenizer = models.get_model(f"translate-tokenizer:{NLLB_MODEL}:{source}",
+                                 lambda: _load_tokenizer(NLLB_MODEL, src_lang=nllb_code(source)))
+    model = models.get_model(f"translate:{NLLB_MODEL}:{inference_backend}",
+                             lambda: quantize.load_model("seq2seq", NLLB_MODEL, inference_backend))
+    return tokenizer, model
+
+
+def generate(tokenizer, model, lines, **generate_args):
+    """줄 목록을 길이별 묶음으로 번역 (입력 순서대로 반환)"""
+    import torch
+
+    lengths = [len(ids) for ids in tokenizer(lines, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+    out = [None] * len(lines)
+    with torch.inference_mode(), metrics.native_work():
+        for bucket in relevance.length_buckets(lengths, BATCH_SIZE, MAX_BATCH_TOKENS):
+            encoded = tokenizer([lines[i] for i in bucket], padding=True, truncation=True, max_length=MAX_LENGTH,
+                                return_tensors="pt")
+            longest = encoded["input_ids"].shape[1]
+            max_new_tokens = min(MAX_LENGTH, int(longest * MAX_LENGTH_RATIO) + MAX_LENGTH_MARGIN)
+            tokens = model.generate(**encoded, num_beams=NUM_BEAMS, do_sample=False, max_new_tokens=max_new_tokens,
+                                    **generate_args)
+            for i, text in zip(bucket, tokenizer.batch_decode(tokens, skip_special_tokens=True)):
+                out[i] = text.strip()
+    return out
+
+
+def model_version(backend, source, target, inference_backend=None):
+    """번역 메모리 키에 쓰는 모델 버전 (모델, 추론 백엔드, 디코딩 설정)"""
+    if backend == "google":
+        return f"google:v{TRANSLATE_VERSION}"
+    model_name = MARIAN_MODEL.format(source=source, target=target) if backend == "marian" else NLLB_MODEL
+    return f"{model_name}:{inference_backend or quantize.BACKEND}:beams{NUM_BEAMS}:v{TRANSLATE_VERSION}"
+
+
+def settings(target_language, source_language=None, backend=None):
+    """번역 결과를 구분하는 번역 설정 (백엔드, 모델 버전). 단계 캐시 키에 사용"""
+    backend = check_backend(backend or BACKEND)
+    source = (source_language or SOURCE_LANGUAGE).lower()
+    target = target_language.lower()
+    if backend == "marian" and (source, target) in _missing_pairs:
+        backend = "nllb"
+    return {"backend": backend, "model": model_version(backend, source, target)}
+
+
+def _translate_google(lines, source, target):
+    from deep_translator import GoogleTranslator
+
+    translator = GoogleTranslator(source=source, target=target)
+    return [text or "" for text in translator.translate_batch(lines)]
+
+
+def _run(lines, source, target, backend, inference_backend):
+    if backend == "google":
+        return _translate_google(lines, source, target)
+    if backend == "nllb":
+        tokenizer, model = get_nllb(source, inference_backend)
+        return generate(tokenizer, model, lines,
+                        forced_bos_token_id=tokenizer.convert_tokens_to_ids(nllb_code(target)))
+    try:
+        tokenizer, model = get_marian(source, target, inference_backend)
+    except OSError:
+        _missing_pairs.add((source, target))
+        raise
+    return generate(tokenizer, model, lines)
+
+
+def _translate(texts, source, target, backend, inference_backend, memory):
+    if backend == "marian" and (source, target) in _missing_pairs:
+        backend = "nllb"
+    version = model_version(backend, source, target, inference_backend)
+    try:
+        return memory.lookup(texts, source, target, backend, version,
+                             lambda missing: _run(missing, source, target, backend, inference_backend))
+    except OSError:
+        if (source, target) not in _missing_pairs:
+            raise
+        # 언어 쌍 모델이 없음 → 다국어 모델로
+        return _translate(texts, source, target, "nllb", inference_backend, memory)
+
+
+def translate_lines(lines, target_language, source_language=None, backend=None, inference_backend=None,
+                    memory=None):
+    """줄 목록 → 번역한 줄 목록 (같은 순서). 원문과 번역 언어가 같으면 그대로 반환
+
+    memory: 번역 메모리 (없으면 프로세스 공유 메모리)
+    """
+    backend = check_backend(backend or BACKEND)
+    source = (source_language or SOURCE_LANGUAGE).lower()
+    target = target_language.lower()
+    lines = list(lines)
+    if source == target or not lines:
+        return lines
+    normalized = [normalize(line) for line in lines]
+    texts = [text for text in dict.fromkeys(normalized) if text]
+    if not texts:
+        return lines
+    table = _translate(texts, source, target, backend, inference_backend, memory or get_translation_memory())
+    return [table.get(text, line) for line, text in zip(lines, normalized)]
+
+
+def translate_cues(cues, target_language, source_language=None, backend=None):
+    """[(시작, 끝, 텍스트)] 의 텍스트를 번역"""
+    cues = list(cues)
+    texts = translate_lines([text for _, _, text in cues], target_language, source_language, backend)
+    return [(start, end, text) for (start, end, _), text in zip(cues, texts)]
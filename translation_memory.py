@@ -0,0 +1,123 @@
+import collections
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from workspace import get_workspace
+
+# ============================================================
+# 번역 메모리
+# - 인트로/아웃트로, 자주 쓰는 말처럼 영상마다 되풀이되는 줄은 한 번만 번역
+# - 키: (정규화한 원문, 원문 언어, 번역 언어, 번역 백엔드, 모델 버전) → 모든 번역 백엔드가 공유
+# - 프로세스 안의 LRU 를 먼저 보고, 없으면 workspace 의 SQLite(translations.db) 에서 찾음
+#   둘 다 없는 줄만 모델/API 로 번역해 두 곳에 저장
+# ============================================================
+
+DB_FILENAME = "translations.db"
+LRU_SIZE = int(os.environ.get("VOCI_TRANSLATION_LRU", "20000"))
+# SQLite 한 쿼리의 매개변수 수 상한(999)보다 작게
+QUERY_CHUNK = 500
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """유니코드 정규화(NFC) + 공백 정리. 같은 문장이 공백/조합 방식만 달라도 같은 키가 되도록"""
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class TranslationMemory:
+    def __init__(self, path, lru_size=LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru = collections.OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS translations (
+                    source TEXT NOT NULL,
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (source_lang, target_lang, backend, model, source)
+                ) WITHOUT ROWID"""
+            )
+
+    def _remember(self, key, translation):
+        # self._lock 을 잡은 상태에서 호출
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts, source_lang, target_lang, backend, model):
+        """정규화한 원문 목록 → 저장된 {원문: 번역} (없는 원문은 빠짐)"""
+        engine = (source_lang, target_lang, backend, model)
+        found, missing = {}, []
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                key = (text, *engine)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[text] = self._lru[key]
+                else:
+                    missing.append(text)
+            for i in range(0, len(missing), QUERY_CHUNK):
+                chunk = missing[i:i + QUERY_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT source, translation FROM translations "
+                    "WHERE source_lang = ? AND target_lang = ? AND backend = ? AND model = ? "
+                    f"AND source IN ({', '.join('?' * len(chunk))})",
+                    (*engine, *chunk),
+                ).fetchall()
+                for text, translation in rows:
+                    found[text] = translation
+                    self._remember((text, *engine), translation)
+        return found
+
+    def put_many(self, pairs, source_lang, target_lang, backend, model):
+        """[(정규화한 원문, 번역)] 저장"""
+        engine = (source_lang, target_lang, backend, model)
+        pairs = list(pairs)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(source, source_lang, target_lang, backend, model, translation, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(text, *engine, translation, now) for text, translation in pairs],
+            )
+            for text, translation in pairs:
+                self._remember((text, *engine), translation)
+
+    def lookup(self, texts, source_lang, target_lang, backend, model, translate_fn):
+        """texts(정규화한 원문) → {원문: 번역}. 저장되지 않은 원문만 translate_fn(원문 목록) 으로 번역해 저장"""
+        found = self.get_many(texts, source_lang, target_lang, backend, model)
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        if missing:
+            translated = translate_fn(missing)
+            self.put_many(zip(missing, translated), source_lang, target_lang, backend, model)
+            found.update(zip(missing, translated))
+        return found
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    # LRU 가 세션/작업 사이에 공유되도록 프로세스당 하나만 사용
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory(os.path.join(get_workspace().root, DB_FILENAME))
+        return _memory
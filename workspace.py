@@ -0,0 +1,170 @@
+import collections
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+# ============================================================
+# 작업 공간(temp) 관리
+# - 세션별 하위 디렉터리: sessions/<session_id>/
+# - 전체 용량 한도(quota)를 넘으면 오래 쓰지 않은 파일부터 삭제 (LRU)
+# - 실행 중인 작업이 잡고 있는(pinned) 파일은 참조 카운트가 0 이 될 때까지 삭제하지 않음
+# ============================================================
+
+DEFAULT_ROOT = os.environ.get("VOCI_WORKSPACE", "temp")
+DEFAULT_QUOTA_BYTES = int(float(os.environ.get("VOCI_WORKSPACE_QUOTA_GB", "20")) * 1024 ** 3)
+# 디스크 전체에 최소한 남겨 둘 여유 공간
+DEFAULT_MIN_FREE_BYTES = int(float(os.environ.get("VOCI_MIN_FREE_GB", "2")) * 1024 ** 3)
+
+# 퇴출 대상 디렉터리 (root 기준 상대 경로). 작업 기록 DB 같은 관리 파일은 포함하지 않음
+EVICTABLE_DIRS = (os.path.join("store", "objects"), "sessions", "cache", "checkpoints", "analysis")
+# 이 시간 동안 쓰이지 않은 빈 세션 디렉터리만 정리
+SESSION_IDLE_SECONDS = 3600
+
+
+class WorkspaceFullError(RuntimeError):
+    pass
+
+
+class Workspace:
+    def __init__(self, root=DEFAULT_ROOT, quota_bytes=DEFAULT_QUOTA_BYTES, min_free_bytes=DEFAULT_MIN_FREE_BYTES):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.min_free_bytes = min_free_bytes
+        self.store_dir = os.path.join(root, "store")
+        self.sessions_dir = os.path.join(root, "sessions")
+        self._lock = threading.RLock()
+        self._refs = collections.Counter()
+        os.makedirs(self.store_dir, exist_ok=True)
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+    # ---------------- 경로 ----------------
+    def session_dir(self, session_id):
+        path = os.path.join(self.sessions_dir, session_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def session_path(self, session_id, name):
+        return os.path.join(self.session_dir(session_id), name)
+
+    # ---------------- 참조 카운트 ----------------
+    def acquire(self, *paths):
+        with self._lock:
+            for path in paths:
+                if path is None:
+                    continue
+                self._refs[os.path.abspath(path)] += 1
+                self.touch(path)
+
+    def release(self, *paths):
+        with self._lock:
+            for path in paths:
+                if path is None:
+                    continue
+                key = os.path.abspath(path)
+                self._refs[key] -= 1
+                if self._refs[key] <= 0:
+                    del self._refs[key]
+
+    @contextmanager
+    def pinned(self, *paths):
+        self.acquire(*paths)
+        try:
+            yield
+        finally:
+            self.release(*paths)
+
+    def is_pinned(self, path):
+        with self._lock:
+            return self._refs.get(os.path.abspath(path), 0) > 0
+
+    @staticmethod
+    def touch(path):
+        # 최근 사용 시각 갱신 (noatime 마운트에서도 동작하도록 mtime 기준)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    # ---------------- 용량 / 퇴출 ----------------
+    def _iter_files(self, evictable_only=False):
+        dirs = EVICTABLE_DIRS if evictable_only else ("",)
+        for rel in dirs:
+            top = os.path.join(self.root, rel)
+            for dirpath, _, filenames in os.walk(top):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def usage(self):
+        return sum(size for _, size, _ in self._iter_files())
+
+    def _disk_free(self):
+        return shutil.disk_usage(self.root).free
+
+    def _fits(self, used, nbytes):
+        if used + nbytes > self.quota_bytes:
+            return False
+        return self._disk_free() - nbytes >= self.min_free_bytes
+
+    def reserve(self, nbytes):
+        """nbytes 를 새로 쓸 수 있도록 LRU 순으로 파일을 지우고, 불가능하면 WorkspaceFullError"""
+        with self._lock:
+            used = self.usage()
+            if self._fits(used, nbytes):
+                return 0
+            candidates = sorted(
+                (item for item in self._iter_files(evictable_only=True)
+                 if not item[0].endswith(".part") and not self.is_pinned(item[0])),
+                key=lambda item: item[2],
+            )
+            # 모두 지워도 한도 안에 들어갈 수 없으면 아무것도 지우지 않음
+            if used - sum(item[1] for item in candidates) + nbytes > self.quota_bytes:
+                self._raise_full(used, nbytes)
+            freed = 0
+            for path, size, _ in candidates:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                freed += size
+                used -= size
+                if self._fits(used, nbytes):
+                    break
+            self._remove_empty_sessions()
+            if not self._fits(used, nbytes):
+                self._raise_full(used, nbytes)
+            return freed
+
+    def _raise_full(self, used, nbytes):
+        raise WorkspaceFullError(
+            f"작업 공간이 부족합니다 (필요: {nbytes} bytes, 사용 중: {used} bytes, 한도: {self.quota_bytes} bytes)"
+        )
+
+    def _remove_empty_sessions(self):
+        cutoff = time.time() - SESSION_IDLE_SECONDS
+        for name in os.listdir(self.sessions_dir):
+            path = os.path.join(self.sessions_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.rmdir(path)
+            except OSError:
+                pass
+
+
+_workspace = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace():
+    # 프로세스 전체에서 하나의 Workspace 를 공유 (참조 카운트가 세션 사이에 공유되어야 함)
+    global _workspace
+    with _workspace_lock:
+        if _workspace is None:
+            _workspace = Workspace()
+        return _workspace